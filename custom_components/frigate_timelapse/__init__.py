@@ -3,15 +3,73 @@
 from __future__ import annotations
 
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta
+from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, Platform
+from homeassistant.core import Event, HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN
-from .frigate_api import FrigateAPI
+from .const import (
+    CONF_ACTIVE_INTERVAL,
+    CONF_DUPLICATE_THRESHOLD,
+    CONF_ENCODER_CPU_SECONDS,
+    CONF_ENCODER_MEMORY_MB,
+    CONF_ENCODER_PROFILE,
+    CONF_ENCODER_THREADS,
+    CONF_GLOBAL_QUOTA_MB,
+    CONF_INGESTION,
+    CONF_LIVE_ENCODE,
+    CONF_OFF_PEAK_END,
+    CONF_OFF_PEAK_START,
+    CONF_OUTPUT_PATH,
+    CONF_PARALLEL_ENCODING,
+    CONF_QUALITY_GATE,
+    CONF_QUOTA_MB,
+    CONF_SEGMENT_MINUTES,
+    CONF_SNAPSHOT_QUALITY,
+    CONF_STORAGE,
+    CONF_THINNING,
+    DATA_CAPTURE_SCHEDULER,
+    DATA_ENCODE_SCHEDULER,
+    DATA_FRAME_WRITER,
+    DATA_RETENTION_ENGINE,
+    DATA_THUMBNAIL_CACHE,
+    DEFAULT_ACTIVE_INTERVAL,
+    DEFAULT_DUPLICATE_THRESHOLD,
+    DEFAULT_ENCODER_CPU_SECONDS,
+    DEFAULT_ENCODER_MEMORY_MB,
+    DEFAULT_ENCODER_PROFILE,
+    DEFAULT_ENCODER_THREADS,
+    DEFAULT_GLOBAL_QUOTA_MB,
+    DEFAULT_INGESTION,
+    DEFAULT_LIVE_ENCODE,
+    DEFAULT_OFF_PEAK_END,
+    DEFAULT_OFF_PEAK_START,
+    DEFAULT_OUTPUT_PATH,
+    DEFAULT_PARALLEL_ENCODING,
+    DEFAULT_QUALITY_GATE,
+    DEFAULT_QUOTA_MB,
+    DEFAULT_SEGMENT_MINUTES,
+    DEFAULT_SNAPSHOT_QUALITY,
+    DEFAULT_STORAGE,
+    DEFAULT_THINNING,
+    DOMAIN,
+    STATE_STORAGE_KEY,
+    STATE_STORAGE_VERSION,
+)
+from .activity import async_get_activity_monitor
+from .capture_scheduler import CaptureScheduler
+from .ffmpeg import Rendition
+from .frame_writer import FrameWriter
+from .frame_selection import SELECTION_POLICIES
+from .frame_view import async_register_views
+from .frigate_api import async_get_frigate_api, async_release_frigate_api
+from .retention import RetentionEngine
+from .scheduler import PRIORITY_BATCH, PRIORITY_MANUAL, EncodeScheduler
 from .timelapse_manager import TimelapseManager
 
 _LOGGER = logging.getLogger(__name__)
@@ -22,30 +80,100 @@ PLATFORMS: list[Platform] = [Platform.SENSOR]
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Frigate Timelapse from a config entry."""
     hass.data.setdefault(DOMAIN, {})
+    config = {**entry.data, **entry.options}
 
-    # Initialize Frigate API
-    frigate_api = FrigateAPI(entry.data["frigate_url"])
+    # Entries pointing at the same Frigate server share one pooled client
+    frigate_api = async_get_frigate_api(hass, config["frigate_url"])
 
     # Verify connection
     try:
         cameras = await frigate_api.get_cameras()
         if not cameras:
             _LOGGER.error("No cameras found in Frigate")
+            await async_release_frigate_api(hass, frigate_api)
             return False
     except Exception as err:
         _LOGGER.error("Failed to connect to Frigate: %s", err)
+        await async_release_frigate_api(hass, frigate_api)
         return False
 
+    # All entries share one scheduler so encodes never oversubscribe the host
+    scheduler = hass.data[DOMAIN].get(DATA_ENCODE_SCHEDULER)
+    if scheduler is None:
+        scheduler = hass.data[DOMAIN][DATA_ENCODE_SCHEDULER] = EncodeScheduler(hass)
+
+    # Captures of every camera are paced by a single scheduler
+    capture_scheduler = hass.data[DOMAIN].get(DATA_CAPTURE_SCHEDULER)
+    if capture_scheduler is None:
+        capture_scheduler = hass.data[DOMAIN][DATA_CAPTURE_SCHEDULER] = (
+            CaptureScheduler(hass)
+        )
+
+    # Frames of every camera are written by one bounded writer
+    frame_writer = hass.data[DOMAIN].get(DATA_FRAME_WRITER)
+    if frame_writer is None:
+        frame_writer = hass.data[DOMAIN][DATA_FRAME_WRITER] = FrameWriter()
+
+    # Quotas may span cameras, so one engine applies retention to all of them
+    retention = hass.data[DOMAIN].get(DATA_RETENTION_ENGINE)
+    if retention is None:
+        retention = hass.data[DOMAIN][DATA_RETENTION_ENGINE] = RetentionEngine(hass)
+
+    # The frame browser views serve every entry and share one thumbnail cache
+    if DATA_THUMBNAIL_CACHE not in hass.data[DOMAIN]:
+        hass.data[DOMAIN][DATA_THUMBNAIL_CACHE] = async_register_views(hass)
+
     # Initialize Timelapse Manager
-    timelapse_manager = TimelapseManager(
-        hass=hass,
-        frigate_api=frigate_api,
-        camera=entry.data["camera"],
-        capture_interval=entry.data.get("capture_interval", 60),
-        output_path=entry.data.get("output_path", "/media/timelapse"),
-        fps=entry.data.get("fps", 30),
-        resolution=entry.data.get("resolution", "1920x1080"),
-    )
+    try:
+        timelapse_manager = TimelapseManager(
+            hass=hass,
+            frigate_api=frigate_api,
+            scheduler=scheduler,
+            capture_scheduler=capture_scheduler,
+            frame_writer=frame_writer,
+            retention=retention,
+            camera=config["camera"],
+            capture_interval=config.get("capture_interval", 60),
+            output_path=config.get("output_path", "/media/timelapse"),
+            fps=config.get("fps", 30),
+            resolution=config.get("resolution", "1920x1080"),
+            live_encode=config.get(CONF_LIVE_ENCODE, DEFAULT_LIVE_ENCODE),
+            segment_minutes=config.get(CONF_SEGMENT_MINUTES, DEFAULT_SEGMENT_MINUTES),
+            parallel_encoding=config.get(
+                CONF_PARALLEL_ENCODING, DEFAULT_PARALLEL_ENCODING
+            ),
+            snapshot_quality=config.get(
+                CONF_SNAPSHOT_QUALITY, DEFAULT_SNAPSHOT_QUALITY
+            ),
+            storage=config.get(CONF_STORAGE, DEFAULT_STORAGE),
+            thinning=config.get(CONF_THINNING, DEFAULT_THINNING),
+            quota_mb=config.get(CONF_QUOTA_MB, DEFAULT_QUOTA_MB),
+            global_quota_mb=config.get(CONF_GLOBAL_QUOTA_MB, DEFAULT_GLOBAL_QUOTA_MB),
+            encoder_profile=config.get(CONF_ENCODER_PROFILE, DEFAULT_ENCODER_PROFILE),
+            encoder_threads=config.get(CONF_ENCODER_THREADS, DEFAULT_ENCODER_THREADS),
+            encoder_cpu_seconds=config.get(
+                CONF_ENCODER_CPU_SECONDS, DEFAULT_ENCODER_CPU_SECONDS
+            ),
+            encoder_memory_mb=config.get(
+                CONF_ENCODER_MEMORY_MB, DEFAULT_ENCODER_MEMORY_MB
+            ),
+            off_peak_start=config.get(CONF_OFF_PEAK_START, DEFAULT_OFF_PEAK_START),
+            off_peak_end=config.get(CONF_OFF_PEAK_END, DEFAULT_OFF_PEAK_END),
+            activity=async_get_activity_monitor(hass, frigate_api),
+            active_interval=config.get(CONF_ACTIVE_INTERVAL, DEFAULT_ACTIVE_INTERVAL),
+            ingestion=config.get(CONF_INGESTION, DEFAULT_INGESTION),
+            quality_gate=config.get(CONF_QUALITY_GATE, DEFAULT_QUALITY_GATE),
+            duplicate_threshold=config.get(
+                CONF_DUPLICATE_THRESHOLD, DEFAULT_DUPLICATE_THRESHOLD
+            ),
+            store=_state_store(hass, entry),
+            adopt_sessions=_sole_user_of_output_path(hass, entry),
+        )
+        await timelapse_manager.async_setup()
+    except Exception as err:
+        _LOGGER.error("Failed to set up timelapse manager: %s", err)
+        await async_release_frigate_api(hass, frigate_api)
+        return False
 
     # Store manager in hass.data
     hass.data[DOMAIN][entry.entry_id] = {
@@ -59,6 +187,25 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Register services
     await _async_register_services(hass, timelapse_manager)
 
+    # Changed options only apply to a manager built from them
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
+    # Entries are not unloaded on shutdown, so the live video is finished here
+    async def _async_shutdown(event: Event) -> None:
+        await timelapse_manager.async_shutdown()
+
+    entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_shutdown)
+    )
+
+    # Pick up the session that was capturing before the restart or reload
+    if timelapse_manager.resume_capture:
+        entry.async_create_background_task(
+            hass,
+            timelapse_manager.start_capture(resume=True),
+            f"{DOMAIN}_resume_{entry.entry_id}",
+        )
+
     return True
 
 
@@ -66,18 +213,59 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         timelapse_manager = hass.data[DOMAIN][entry.entry_id]["timelapse_manager"]
-        await timelapse_manager.stop_capture()
-        hass.data[DOMAIN].pop(entry.entry_id)
+        await timelapse_manager.async_close()
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        await async_release_frigate_api(hass, entry_data["frigate_api"])
 
     return unload_ok
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload a config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the persisted state of a removed config entry."""
+    await _state_store(hass, entry).async_remove()
+
+
+def _sole_user_of_output_path(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Return True if no other entry writes to the output path of an entry."""
+
+    def output_path(config_entry: ConfigEntry) -> str:
+        config = {**config_entry.data, **config_entry.options}
+        return config.get(CONF_OUTPUT_PATH, DEFAULT_OUTPUT_PATH)
+
+    return not any(
+        output_path(other) == output_path(entry)
+        for other in hass.config_entries.async_entries(DOMAIN)
+        if other.entry_id != entry.entry_id
+    )
+
+
+def _state_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    """Return the store holding the manager state of an entry."""
+    return Store(hass, STATE_STORAGE_VERSION, STATE_STORAGE_KEY.format(entry.entry_id))
+
+
 async def _async_register_services(
     hass: HomeAssistant, manager: TimelapseManager
 ) -> None:
     """Register services for the integration."""
     from .const import (
+        ATTR_DESTINATION,
+        ATTR_DURATION,
+        ATTR_JOB_ID,
+        ATTR_MAX_FRAMES,
+        ATTR_PRIORITY,
+        ATTR_RENDITIONS,
+        ATTR_SELECTION,
+        ATTR_SESSION,
+        PRIORITY_BATCH_NAME,
+        SERVICE_CANCEL_TIMELAPSE,
         SERVICE_CAPTURE_IMAGE,
+        SERVICE_EXPORT_FRAMES,
         SERVICE_GENERATE_TIMELAPSE,
         SERVICE_START_CAPTURE,
         SERVICE_STOP_CAPTURE,
@@ -87,12 +275,63 @@ async def _async_register_services(
         """Handle capture image service."""
         await manager.capture_single_image()
 
-    async def handle_generate_timelapse(call):
+    async def handle_generate_timelapse(call: ServiceCall):
         """Handle generate timelapse service."""
-        start_time = call.data.get("start_time")
-        end_time = call.data.get("end_time")
+        start_time = _parse_time(call.data.get("start_time"))
+        end_time = _parse_time(call.data.get("end_time"))
         output_file = call.data.get("output_file")
-        await manager.generate_timelapse(start_time, end_time, output_file)
+        duration = call.data.get(ATTR_DURATION)
+        max_frames = call.data.get(ATTR_MAX_FRAMES)
+        selection = call.data.get(ATTR_SELECTION) or []
+        if isinstance(selection, str):
+            selection = [selection]
+        if unknown := set(selection) - set(SELECTION_POLICIES):
+            raise ValueError(f"Unknown selection policies: {', '.join(unknown)}")
+        renditions = _parse_renditions(call.data.get(ATTR_RENDITIONS))
+        priority = (
+            PRIORITY_BATCH
+            if call.data.get(ATTR_PRIORITY) == PRIORITY_BATCH_NAME
+            else PRIORITY_MANUAL
+        )
+
+        if not call.return_response:
+            # Run in the background, completion is announced with an event
+            hass.async_create_task(
+                manager.async_run_job(
+                    start_time,
+                    end_time,
+                    output_file,
+                    priority,
+                    duration,
+                    max_frames,
+                    selection,
+                    renditions,
+                )
+            )
+            return None
+
+        job = await manager.async_run_job(
+            start_time,
+            end_time,
+            output_file,
+            priority,
+            duration,
+            max_frames,
+            selection,
+            renditions,
+        )
+        return job.as_dict()
+
+    async def handle_cancel_timelapse(call: ServiceCall):
+        """Handle cancel timelapse service."""
+        manager.cancel_timelapse(call.data.get(ATTR_JOB_ID))
+
+    async def handle_export_frames(call: ServiceCall):
+        """Handle export frames service."""
+        written = await manager.export_frames(
+            call.data.get(ATTR_SESSION), call.data.get(ATTR_DESTINATION)
+        )
+        return {"frames": written}
 
     async def handle_start_capture(call):
         """Handle start capture service."""
@@ -104,7 +343,48 @@ async def _async_register_services(
 
     hass.services.async_register(DOMAIN, SERVICE_CAPTURE_IMAGE, handle_capture_image)
     hass.services.async_register(
-        DOMAIN, SERVICE_GENERATE_TIMELAPSE, handle_generate_timelapse
+        DOMAIN,
+        SERVICE_GENERATE_TIMELAPSE,
+        handle_generate_timelapse,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_CANCEL_TIMELAPSE, handle_cancel_timelapse
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_FRAMES,
+        handle_export_frames,
+        supports_response=SupportsResponse.OPTIONAL,
     )
     hass.services.async_register(DOMAIN, SERVICE_START_CAPTURE, handle_start_capture)
     hass.services.async_register(DOMAIN, SERVICE_STOP_CAPTURE, handle_stop_capture)
+
+
+def _parse_time(value: Any) -> datetime | None:
+    """Parse a service call time given as text or as a datetime."""
+    if value is None or isinstance(value, datetime):
+        return value
+    parsed = dt_util.parse_datetime(str(value))
+    if parsed is None:
+        raise ValueError(f"Invalid time: {value}")
+    return parsed
+
+
+def _parse_renditions(value: Any) -> list[Rendition] | None:
+    """Parse the renditions of a service call given as a list of mappings."""
+    if not value:
+        return None
+    if isinstance(value, dict):
+        value = [value]
+    try:
+        renditions = [Rendition(**rendition) for rendition in value]
+    except TypeError as err:
+        raise ValueError(f"Invalid renditions: {err}") from err
+    # Outputs are named by suffix, a repeated one would overwrite another
+    suffixes = [rendition.suffix for rendition in renditions]
+    if len(set(suffixes)) != len(suffixes):
+        raise ValueError(
+            "Invalid renditions: each needs its own resolution or container"
+        )
+    return renditions
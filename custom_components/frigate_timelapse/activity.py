@@ -0,0 +1,146 @@
+"""Detection activity tracking driving adaptive capture rates."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import Protocol
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import DATA_ACTIVITY_MONITORS, DOMAIN
+from .frigate_api import FrigateAPI
+
+_LOGGER = logging.getLogger(__name__)
+
+# How often in-progress events are polled, shared by every camera of a server
+EVENT_POLL_INTERVAL = timedelta(seconds=5)
+
+
+class EventSource(Protocol):
+    """Source of the cameras with detections in progress."""
+
+    async def async_active_cameras(self) -> set[str] | None:
+        """Return the cameras with active objects, or None if unknown."""
+
+
+class FrigateEventSource:
+    """Read in-progress events from Frigate's /api/events."""
+
+    def __init__(self, frigate_api: FrigateAPI) -> None:
+        """Initialize the source."""
+        self.frigate_api = frigate_api
+
+    async def async_active_cameras(self) -> set[str] | None:
+        """Return the cameras of events that have not ended yet."""
+        events = await self.frigate_api.get_events(in_progress=True)
+        if events is None:
+            return None
+        return {event["camera"] for event in events if event.get("camera")}
+
+
+class FakeEventSource:
+    """In-memory event source for exercising adaptive capture without Frigate."""
+
+    def __init__(self) -> None:
+        """Initialize the source with no active cameras."""
+        self.active: set[str] = set()
+
+    async def async_active_cameras(self) -> set[str] | None:
+        """Return the cameras marked active."""
+        return set(self.active)
+
+
+class ActivityMonitor:
+    """Poll an event source and report activity changes to cameras.
+
+    One monitor serves every camera of a Frigate server, so a single request
+    per poll covers all of them. Polling only runs while cameras subscribe.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        source: EventSource,
+        poll_interval: timedelta = EVENT_POLL_INTERVAL,
+    ) -> None:
+        """Initialize the monitor."""
+        self.hass = hass
+        self.source = source
+        self.poll_interval = poll_interval
+        self._callbacks: dict[str, list[Callable[[bool], None]]] = {}
+        self._active: set[str] = set()
+        self._unsub_timer: CALLBACK_TYPE | None = None
+        self._lock = asyncio.Lock()
+
+    def subscribe(self, camera: str, callback: Callable[[bool], None]) -> CALLBACK_TYPE:
+        """Call callback with True when activity starts, False when it ends."""
+        self._callbacks.setdefault(camera, []).append(callback)
+        if camera in self._active:
+            callback(True)
+        if self._unsub_timer is None:
+            self._unsub_timer = async_track_time_interval(
+                self.hass, self._async_poll, self.poll_interval
+            )
+
+        def unsubscribe() -> None:
+            callbacks = self._callbacks.get(camera, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if not callbacks:
+                self._callbacks.pop(camera, None)
+                self._active.discard(camera)
+            if not self._callbacks and self._unsub_timer is not None:
+                self._unsub_timer()
+                self._unsub_timer = None
+
+        return unsubscribe
+
+    async def _async_poll(self, _now: datetime) -> None:
+        """Fetch active cameras and notify those whose activity changed."""
+        # A slow server must not stack up polls
+        if self._lock.locked():
+            return
+        async with self._lock:
+            try:
+                active = await self.source.async_active_cameras()
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.error("Error polling detection events: %s", err)
+                return
+        if active is None:
+            return
+
+        for camera, callbacks in list(self._callbacks.items()):
+            is_active = camera in active
+            if is_active == (camera in self._active):
+                continue
+            _LOGGER.debug(
+                "Activity on %s %s", camera, "started" if is_active else "ended"
+            )
+            if is_active:
+                self._active.add(camera)
+            else:
+                self._active.discard(camera)
+            for callback in list(callbacks):
+                callback(is_active)
+
+
+def async_get_activity_monitor(
+    hass: HomeAssistant, frigate_api: FrigateAPI
+) -> ActivityMonitor:
+    """Return the activity monitor of a Frigate server, creating it if needed."""
+    monitors: dict[str, ActivityMonitor] = hass.data.setdefault(DOMAIN, {}).setdefault(
+        DATA_ACTIVITY_MONITORS, {}
+    )
+    monitor = monitors.get(frigate_api.base_url)
+    if monitor is None:
+        monitor = monitors[frigate_api.base_url] = ActivityMonitor(
+            hass, FrigateEventSource(frigate_api)
+        )
+    elif isinstance(monitor.source, FrigateEventSource):
+        # The shared client may have been released and recreated since
+        monitor.source.frigate_api = frigate_api
+    return monitor
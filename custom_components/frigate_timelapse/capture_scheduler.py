@@ -0,0 +1,157 @@
+"""Central capture scheduler shared by every camera."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import math
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+# Maximum number of snapshot fetches running at once across all cameras
+MAX_CONCURRENT_CAPTURES = 4
+
+# Upper bound of the random delay added to each tick
+MAX_JITTER = 0.25  # seconds
+
+
+@dataclass
+class _Camera:
+    """A camera registered with the scheduler."""
+
+    interval: float
+    action: Callable[[datetime], Awaitable[None]]
+    on_skip: Callable[[datetime], None] | None = None
+    offset: float = 0.0
+    deadline: float = 0.0
+    # Set from the tick starting a capture until it ends, waiting included
+    pending: bool = False
+
+
+class CaptureScheduler:
+    """Drive periodic captures of every camera from a single timer.
+
+    Cameras are given evenly spread phase offsets within their interval and
+    fire on wall-clock aligned deadlines, so captures neither burst at the
+    same instant nor drift over time. A camera whose previous capture is
+    still waiting or running drops its tick instead of queueing it.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, max_concurrent: int = MAX_CONCURRENT_CAPTURES
+    ) -> None:
+        """Initialize the scheduler."""
+        self.hass = hass
+        self._cameras: dict[int, _Camera] = {}
+        self._ids = itertools.count()
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._unsub_timer: CALLBACK_TYPE | None = None
+
+    def register(
+        self,
+        interval: float,
+        action: Callable[[datetime], Awaitable[None]],
+        on_skip: Callable[[datetime], None] | None = None,
+    ) -> CALLBACK_TYPE:
+        """Call action every interval seconds, returning an unregister callback.
+
+        on_skip is called with the deadline of every dropped tick.
+        """
+        camera_id = next(self._ids)
+        self._cameras[camera_id] = _Camera(
+            interval=interval, action=action, on_skip=on_skip
+        )
+        self._rebalance()
+
+        def unregister() -> None:
+            if self._cameras.pop(camera_id, None) is not None:
+                self._rebalance()
+
+        return unregister
+
+    def set_interval(
+        self, action: Callable[[datetime], Awaitable[None]], interval: float
+    ) -> None:
+        """Change the interval of a registered action.
+
+        The camera keeps its phase where the new interval allows it, and its
+        next capture is the first deadline of the new interval.
+        """
+        for camera in self._cameras.values():
+            if camera.action == action and camera.interval != interval:
+                camera.offset %= interval
+                camera.interval = interval
+                camera.deadline = self._next_deadline(camera, time.time())
+                self._schedule()
+                return
+
+    def _rebalance(self) -> None:
+        """Spread phase offsets evenly and reschedule."""
+        now = time.time()
+        count = len(self._cameras)
+        for index, camera in enumerate(self._cameras.values()):
+            camera.offset = camera.interval * index / count
+            camera.deadline = self._next_deadline(camera, now)
+        self._schedule()
+
+    @staticmethod
+    def _next_deadline(camera: _Camera, after: float) -> float:
+        """Return the first aligned deadline strictly after a time."""
+        ticks = math.floor((after - camera.offset) / camera.interval) + 1
+        return ticks * camera.interval + camera.offset
+
+    def _schedule(self) -> None:
+        """Arm the timer for the earliest deadline."""
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+
+        if not self._cameras:
+            return
+
+        deadline = min(camera.deadline for camera in self._cameras.values())
+        delay = max(0.0, deadline - time.time()) + random.uniform(0, MAX_JITTER)
+        self._unsub_timer = async_call_later(self.hass, delay, self._async_tick)
+
+    async def _async_tick(self, _now: datetime) -> None:
+        """Start every capture whose deadline has passed."""
+        self._unsub_timer = None
+        now = time.time()
+
+        for camera in self._cameras.values():
+            if camera.deadline > now:
+                continue
+
+            if camera.pending:
+                # Captures queued behind a slow Frigate would fire as a burst
+                # of stale frames, so drop the tick
+                if camera.on_skip is not None:
+                    camera.on_skip(datetime.fromtimestamp(camera.deadline))
+            else:
+                camera.pending = True
+                self.hass.async_create_task(self._run(camera, camera.deadline))
+            # Advance from the deadline, not from now, so ticks never drift
+            camera.deadline += camera.interval
+            if camera.deadline <= now:
+                camera.deadline = self._next_deadline(camera, now)
+
+        self._schedule()
+
+    async def _run(self, camera: _Camera, deadline: float) -> None:
+        """Run a capture, bounded by the global concurrency limit."""
+        try:
+            async with self._semaphore:
+                await camera.action(datetime.fromtimestamp(deadline))
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error("Error in scheduled capture: %s", err)
+        finally:
+            camera.pending = False
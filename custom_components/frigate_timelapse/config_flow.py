@@ -20,19 +20,55 @@ from .const import (
     CONF_OUTPUT_PATH,
     CONF_FPS,
     CONF_RESOLUTION,
+    CONF_LIVE_ENCODE,
+    CONF_SEGMENT_MINUTES,
+    CONF_PARALLEL_ENCODING,
+    CONF_DUPLICATE_THRESHOLD,
+    CONF_SNAPSHOT_QUALITY,
+    CONF_STORAGE,
+    CONF_THINNING,
+    CONF_QUOTA_MB,
+    CONF_GLOBAL_QUOTA_MB,
+    CONF_ENCODER_PROFILE,
+    CONF_ENCODER_THREADS,
+    CONF_ENCODER_CPU_SECONDS,
+    CONF_ENCODER_MEMORY_MB,
+    CONF_OFF_PEAK_START,
+    CONF_OFF_PEAK_END,
+    CONF_ACTIVE_INTERVAL,
+    CONF_INGESTION,
+    CONF_QUALITY_GATE,
     DEFAULT_CAPTURE_INTERVAL,
     DEFAULT_FPS,
     DEFAULT_OUTPUT_PATH,
     DEFAULT_RESOLUTION,
+    DEFAULT_LIVE_ENCODE,
+    DEFAULT_SEGMENT_MINUTES,
+    DEFAULT_PARALLEL_ENCODING,
+    DEFAULT_DUPLICATE_THRESHOLD,
+    DEFAULT_SNAPSHOT_QUALITY,
+    DEFAULT_STORAGE,
+    DEFAULT_THINNING,
+    DEFAULT_QUOTA_MB,
+    DEFAULT_GLOBAL_QUOTA_MB,
+    DEFAULT_ENCODER_PROFILE,
+    DEFAULT_ENCODER_THREADS,
+    DEFAULT_ENCODER_CPU_SECONDS,
+    DEFAULT_ENCODER_MEMORY_MB,
+    DEFAULT_OFF_PEAK_START,
+    DEFAULT_OFF_PEAK_END,
+    DEFAULT_ACTIVE_INTERVAL,
+    DEFAULT_INGESTION,
+    DEFAULT_QUALITY_GATE,
 )
-from .frigate_api import FrigateAPI
+from .frigate_api import async_get_frigate_api, async_release_frigate_api
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect."""
-    frigate_api = FrigateAPI(data[CONF_FRIGATE_URL])
+    frigate_api = async_get_frigate_api(hass, data[CONF_FRIGATE_URL])
 
     try:
         cameras = await frigate_api.get_cameras()
@@ -41,7 +77,7 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
     except Exception as err:
         raise CannotConnect(f"Cannot connect to Frigate: {err}")
     finally:
-        await frigate_api.close()
+        await async_release_frigate_api(hass, frigate_api)
 
     return {"title": f"Frigate Timelapse - {data[CONF_CAMERA]}", "cameras": cameras}
 
@@ -65,9 +101,13 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         if user_input is not None:
             try:
-                frigate_api = FrigateAPI(user_input[CONF_FRIGATE_URL])
-                cameras = await frigate_api.get_cameras()
-                await frigate_api.close()
+                frigate_api = async_get_frigate_api(
+                    self.hass, user_input[CONF_FRIGATE_URL]
+                )
+                try:
+                    cameras = await frigate_api.get_cameras()
+                finally:
+                    await async_release_frigate_api(self.hass, frigate_api)
 
                 if not cameras:
                     errors["base"] = "no_cameras"
@@ -129,6 +169,24 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 CONF_OUTPUT_PATH: user_input[CONF_OUTPUT_PATH],
                 CONF_FPS: user_input[CONF_FPS],
                 CONF_RESOLUTION: user_input[CONF_RESOLUTION],
+                CONF_LIVE_ENCODE: user_input[CONF_LIVE_ENCODE],
+                CONF_SEGMENT_MINUTES: user_input[CONF_SEGMENT_MINUTES],
+                CONF_PARALLEL_ENCODING: user_input[CONF_PARALLEL_ENCODING],
+                CONF_DUPLICATE_THRESHOLD: user_input[CONF_DUPLICATE_THRESHOLD],
+                CONF_SNAPSHOT_QUALITY: user_input[CONF_SNAPSHOT_QUALITY],
+                CONF_STORAGE: user_input[CONF_STORAGE],
+                CONF_THINNING: user_input[CONF_THINNING],
+                CONF_QUOTA_MB: user_input[CONF_QUOTA_MB],
+                CONF_GLOBAL_QUOTA_MB: user_input[CONF_GLOBAL_QUOTA_MB],
+                CONF_ENCODER_PROFILE: user_input[CONF_ENCODER_PROFILE],
+                CONF_ENCODER_THREADS: user_input[CONF_ENCODER_THREADS],
+                CONF_ENCODER_CPU_SECONDS: user_input[CONF_ENCODER_CPU_SECONDS],
+                CONF_ENCODER_MEMORY_MB: user_input[CONF_ENCODER_MEMORY_MB],
+                CONF_OFF_PEAK_START: user_input[CONF_OFF_PEAK_START],
+                CONF_OFF_PEAK_END: user_input[CONF_OFF_PEAK_END],
+                CONF_ACTIVE_INTERVAL: user_input[CONF_ACTIVE_INTERVAL],
+                CONF_INGESTION: user_input[CONF_INGESTION],
+                CONF_QUALITY_GATE: user_input[CONF_QUALITY_GATE],
             }
 
             return self.async_create_entry(
@@ -150,6 +208,56 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     vol.Required(CONF_RESOLUTION, default=DEFAULT_RESOLUTION): vol.In(
                         ["1920x1080", "1280x720", "3840x2160", "2560x1440"]
                     ),
+                    vol.Required(CONF_LIVE_ENCODE, default=DEFAULT_LIVE_ENCODE): bool,
+                    vol.Required(
+                        CONF_SEGMENT_MINUTES, default=DEFAULT_SEGMENT_MINUTES
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1440)),
+                    vol.Required(
+                        CONF_PARALLEL_ENCODING, default=DEFAULT_PARALLEL_ENCODING
+                    ): bool,
+                    vol.Required(
+                        CONF_DUPLICATE_THRESHOLD, default=DEFAULT_DUPLICATE_THRESHOLD
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=64)),
+                    vol.Required(
+                        CONF_SNAPSHOT_QUALITY, default=DEFAULT_SNAPSHOT_QUALITY
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+                    vol.Required(CONF_STORAGE, default=DEFAULT_STORAGE): vol.In(
+                        ["files", "packed"]
+                    ),
+                    vol.Required(CONF_THINNING, default=DEFAULT_THINNING): bool,
+                    vol.Required(CONF_QUOTA_MB, default=DEFAULT_QUOTA_MB): vol.All(
+                        vol.Coerce(int), vol.Range(min=0)
+                    ),
+                    vol.Required(
+                        CONF_GLOBAL_QUOTA_MB, default=DEFAULT_GLOBAL_QUOTA_MB
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_ENCODER_PROFILE, default=DEFAULT_ENCODER_PROFILE
+                    ): vol.In(["normal", "low", "idle"]),
+                    vol.Required(
+                        CONF_ENCODER_THREADS, default=DEFAULT_ENCODER_THREADS
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=64)),
+                    vol.Required(
+                        CONF_ENCODER_CPU_SECONDS, default=DEFAULT_ENCODER_CPU_SECONDS
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_ENCODER_MEMORY_MB, default=DEFAULT_ENCODER_MEMORY_MB
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_OFF_PEAK_START, default=DEFAULT_OFF_PEAK_START
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=23)),
+                    vol.Required(
+                        CONF_OFF_PEAK_END, default=DEFAULT_OFF_PEAK_END
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=23)),
+                    vol.Required(
+                        CONF_ACTIVE_INTERVAL, default=DEFAULT_ACTIVE_INTERVAL
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+                    vol.Required(CONF_INGESTION, default=DEFAULT_INGESTION): vol.In(
+                        ["poll", "stream"]
+                    ),
+                    vol.Required(
+                        CONF_QUALITY_GATE, default=DEFAULT_QUALITY_GATE
+                    ): vol.In(["off", "tag", "reject"]),
                 }
             ),
         )
@@ -177,32 +285,122 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         if user_input is not None:
             return self.async_create_entry(title="", data=user_input)
 
+        # Options saved earlier override the values of the initial setup
+        config = {**self.config_entry.data, **self.config_entry.options}
         return self.async_show_form(
             step_id="init",
             data_schema=vol.Schema(
                 {
                     vol.Required(
                         CONF_CAPTURE_INTERVAL,
-                        default=self.config_entry.data.get(
+                        default=config.get(
                             CONF_CAPTURE_INTERVAL, DEFAULT_CAPTURE_INTERVAL
                         ),
                     ): vol.All(vol.Coerce(int), vol.Range(min=10, max=3600)),
                     vol.Required(
                         CONF_OUTPUT_PATH,
-                        default=self.config_entry.data.get(
-                            CONF_OUTPUT_PATH, DEFAULT_OUTPUT_PATH
-                        ),
+                        default=config.get(CONF_OUTPUT_PATH, DEFAULT_OUTPUT_PATH),
                     ): str,
                     vol.Required(
                         CONF_FPS,
-                        default=self.config_entry.data.get(CONF_FPS, DEFAULT_FPS),
+                        default=config.get(CONF_FPS, DEFAULT_FPS),
                     ): vol.All(vol.Coerce(int), vol.Range(min=1, max=60)),
                     vol.Required(
                         CONF_RESOLUTION,
-                        default=self.config_entry.data.get(
-                            CONF_RESOLUTION, DEFAULT_RESOLUTION
-                        ),
+                        default=config.get(CONF_RESOLUTION, DEFAULT_RESOLUTION),
                     ): vol.In(["1920x1080", "1280x720", "3840x2160", "2560x1440"]),
+                    vol.Required(
+                        CONF_LIVE_ENCODE,
+                        default=config.get(CONF_LIVE_ENCODE, DEFAULT_LIVE_ENCODE),
+                    ): bool,
+                    vol.Required(
+                        CONF_SEGMENT_MINUTES,
+                        default=config.get(
+                            CONF_SEGMENT_MINUTES, DEFAULT_SEGMENT_MINUTES
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1440)),
+                    vol.Required(
+                        CONF_PARALLEL_ENCODING,
+                        default=config.get(
+                            CONF_PARALLEL_ENCODING, DEFAULT_PARALLEL_ENCODING
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_DUPLICATE_THRESHOLD,
+                        default=config.get(
+                            CONF_DUPLICATE_THRESHOLD, DEFAULT_DUPLICATE_THRESHOLD
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=64)),
+                    vol.Required(
+                        CONF_SNAPSHOT_QUALITY,
+                        default=config.get(
+                            CONF_SNAPSHOT_QUALITY, DEFAULT_SNAPSHOT_QUALITY
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+                    vol.Required(
+                        CONF_STORAGE,
+                        default=config.get(CONF_STORAGE, DEFAULT_STORAGE),
+                    ): vol.In(["files", "packed"]),
+                    vol.Required(
+                        CONF_THINNING,
+                        default=config.get(CONF_THINNING, DEFAULT_THINNING),
+                    ): bool,
+                    vol.Required(
+                        CONF_QUOTA_MB,
+                        default=config.get(CONF_QUOTA_MB, DEFAULT_QUOTA_MB),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_GLOBAL_QUOTA_MB,
+                        default=config.get(
+                            CONF_GLOBAL_QUOTA_MB, DEFAULT_GLOBAL_QUOTA_MB
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_ENCODER_PROFILE,
+                        default=config.get(
+                            CONF_ENCODER_PROFILE, DEFAULT_ENCODER_PROFILE
+                        ),
+                    ): vol.In(["normal", "low", "idle"]),
+                    vol.Required(
+                        CONF_ENCODER_THREADS,
+                        default=config.get(
+                            CONF_ENCODER_THREADS, DEFAULT_ENCODER_THREADS
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=64)),
+                    vol.Required(
+                        CONF_ENCODER_CPU_SECONDS,
+                        default=config.get(
+                            CONF_ENCODER_CPU_SECONDS, DEFAULT_ENCODER_CPU_SECONDS
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_ENCODER_MEMORY_MB,
+                        default=config.get(
+                            CONF_ENCODER_MEMORY_MB, DEFAULT_ENCODER_MEMORY_MB
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_OFF_PEAK_START,
+                        default=config.get(CONF_OFF_PEAK_START, DEFAULT_OFF_PEAK_START),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=23)),
+                    vol.Required(
+                        CONF_OFF_PEAK_END,
+                        default=config.get(CONF_OFF_PEAK_END, DEFAULT_OFF_PEAK_END),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=23)),
+                    vol.Required(
+                        CONF_ACTIVE_INTERVAL,
+                        default=config.get(
+                            CONF_ACTIVE_INTERVAL, DEFAULT_ACTIVE_INTERVAL
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+                    vol.Required(
+                        CONF_INGESTION,
+                        default=config.get(CONF_INGESTION, DEFAULT_INGESTION),
+                    ): vol.In(["poll", "stream"]),
+                    vol.Required(
+                        CONF_QUALITY_GATE,
+                        default=config.get(CONF_QUALITY_GATE, DEFAULT_QUALITY_GATE),
+                    ): vol.In(["off", "tag", "reject"]),
                 }
             ),
         )
@@ -7,17 +7,88 @@ CONF_CAPTURE_INTERVAL = "capture_interval"
 CONF_OUTPUT_PATH = "output_path"
 CONF_FPS = "fps"
 CONF_RESOLUTION = "resolution"
+CONF_LIVE_ENCODE = "live_encode"
+CONF_SEGMENT_MINUTES = "segment_minutes"
+CONF_PARALLEL_ENCODING = "parallel_encoding"
+CONF_DUPLICATE_THRESHOLD = "duplicate_threshold"
+CONF_SNAPSHOT_QUALITY = "snapshot_quality"
+CONF_STORAGE = "storage"
+CONF_THINNING = "thinning"
+CONF_QUOTA_MB = "quota_mb"
+CONF_GLOBAL_QUOTA_MB = "global_quota_mb"
+CONF_ENCODER_PROFILE = "encoder_profile"
+CONF_ENCODER_THREADS = "encoder_threads"
+CONF_ENCODER_CPU_SECONDS = "encoder_cpu_seconds"
+CONF_ENCODER_MEMORY_MB = "encoder_memory_mb"
+CONF_OFF_PEAK_START = "off_peak_start"
+CONF_OFF_PEAK_END = "off_peak_end"
+CONF_ACTIVE_INTERVAL = "active_interval"
+CONF_INGESTION = "ingestion"
+CONF_QUALITY_GATE = "quality_gate"
 
 DEFAULT_CAPTURE_INTERVAL = 60  # seconds
 DEFAULT_FPS = 30
 DEFAULT_OUTPUT_PATH = "/media/timelapse"
 DEFAULT_RESOLUTION = "1920x1080"
+DEFAULT_LIVE_ENCODE = False
+DEFAULT_SEGMENT_MINUTES = 0  # disabled
+DEFAULT_PARALLEL_ENCODING = False
+DEFAULT_DUPLICATE_THRESHOLD = 0  # disabled
+DEFAULT_SNAPSHOT_QUALITY = 70
+DEFAULT_STORAGE = "files"
+DEFAULT_THINNING = False
+DEFAULT_QUOTA_MB = 0  # unlimited
+DEFAULT_GLOBAL_QUOTA_MB = 0  # unlimited
+DEFAULT_ENCODER_PROFILE = "normal"
+DEFAULT_ENCODER_THREADS = 0  # automatic
+DEFAULT_ENCODER_CPU_SECONDS = 0  # unlimited
+DEFAULT_ENCODER_MEMORY_MB = 0  # unlimited
+DEFAULT_OFF_PEAK_START = 0
+DEFAULT_OFF_PEAK_END = 0  # same as start: disabled
+DEFAULT_ACTIVE_INTERVAL = 0  # disabled
+DEFAULT_INGESTION = "poll"
+DEFAULT_QUALITY_GATE = "tag"
+
+# Frame storage backends
+STORAGE_FILES = "files"
+STORAGE_PACKED = "packed"
+
+# Frame ingestion backends
+INGESTION_POLL = "poll"
+INGESTION_STREAM = "stream"
+
+# Frame quality gate policies
+QUALITY_GATE_OFF = "off"
+QUALITY_GATE_TAG = "tag"
+QUALITY_GATE_REJECT = "reject"
+
+# Shared objects in hass.data[DOMAIN]
+DATA_ACTIVITY_MONITORS = "activity_monitors"
+DATA_CAPTURE_SCHEDULER = "capture_scheduler"
+DATA_ENCODE_SCHEDULER = "encode_scheduler"
+DATA_FRIGATE_CLIENTS = "frigate_clients"
+DATA_FRAME_WRITER = "frame_writer"
+DATA_RETENTION_ENGINE = "retention_engine"
+DATA_THUMBNAIL_CACHE = "thumbnail_cache"
+
+# Frame catalog, kept on local storage as SQLite WAL is unsafe on network mounts
+CATALOG_FILENAME = f"{DOMAIN}.db"
+
+# Manager state kept across restarts, one store per config entry
+STATE_STORAGE_KEY = f"{DOMAIN}.{{}}"
+STATE_STORAGE_VERSION = 1
+STATE_SAVE_DELAY = 10  # seconds
 
 # Services
 SERVICE_CAPTURE_IMAGE = "capture_image"
 SERVICE_GENERATE_TIMELAPSE = "generate_timelapse"
 SERVICE_START_CAPTURE = "start_capture"
 SERVICE_STOP_CAPTURE = "stop_capture"
+SERVICE_CANCEL_TIMELAPSE = "cancel_timelapse"
+SERVICE_EXPORT_FRAMES = "export_frames"
+
+# Events
+EVENT_TIMELAPSE_FINISHED = f"{DOMAIN}_timelapse_finished"
 
 # Attributes
 ATTR_CAMERA = "camera"
@@ -28,6 +99,17 @@ ATTR_IMAGES_COUNT = "images_count"
 ATTR_STATUS = "status"
 ATTR_LAST_CAPTURE = "last_capture"
 ATTR_TIMELAPSE_PATH = "timelapse_path"
+ATTR_JOB_ID = "job_id"
+ATTR_PRIORITY = "priority"
+ATTR_DURATION = "duration"
+ATTR_MAX_FRAMES = "max_frames"
+ATTR_SELECTION = "selection"
+ATTR_RENDITIONS = "renditions"
+ATTR_SESSION = "session"
+ATTR_DESTINATION = "destination"
+
+# Encode priorities
+PRIORITY_BATCH_NAME = "batch"
 
 # States
 STATE_IDLE = "idle"
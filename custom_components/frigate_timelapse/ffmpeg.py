@@ -0,0 +1,656 @@
+"""ffmpeg helpers for timelapse encoding."""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import os
+import shutil
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+from functools import cache, partial
+from pathlib import Path
+from typing import BinaryIO
+
+from .frame_catalog import Frame
+from .frame_store import write_frames
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds between forced keyframes, so separately encoded parts share the
+# same GOP structure and can be joined losslessly
+GOP_SECONDS = 2
+
+# Smallest chunk worth starting a dedicated encoder for
+MIN_CHUNK_FRAMES = 300
+
+ProgressCallback = Callable[[int], None]
+
+MEGABYTE = 1024 * 1024
+
+# ionice scheduling classes
+IO_CLASS_BEST_EFFORT = 2
+IO_CLASS_IDLE = 3
+
+
+@dataclass(frozen=True)
+class EncoderLimits:
+    """Operating system limits applied to every ffmpeg process started.
+
+    The CPU time and memory limits apply to each process separately: ffmpeg
+    is killed once it used cpu_seconds of CPU time, and allocations past
+    memory_mb of address space fail.
+    """
+
+    nice: int = 0
+    io_class: int | None = None
+    io_level: int | None = None
+    max_threads: int | None = None
+    cpu_seconds: int | None = None
+    memory_mb: int | None = None
+
+    def threads(self, threads: int | None) -> int | None:
+        """Return the encoder threads to use, capped by max_threads."""
+        if self.max_threads and threads:
+            return min(threads, self.max_threads)
+        return self.max_threads or threads
+
+    def command(self, cmd: list[str]) -> list[str]:
+        """Return the command prefixed with the tools applying the limits.
+
+        The limits are set by prlimit, nice and ionice wrappers that exec
+        ffmpeg, not in the forked child, which is unsafe in a threaded
+        process. A limit whose tool is missing is not applied.
+        """
+        prefix = []
+        if (self.cpu_seconds or self.memory_mb) and _has_tool("prlimit"):
+            prefix.append("prlimit")
+            if self.cpu_seconds:
+                # SIGXCPU at the soft limit lets ffmpeg exit, SIGKILL follows
+                prefix.append(f"--cpu={self.cpu_seconds}:{self.cpu_seconds + 5}")
+            if self.memory_mb:
+                prefix.append(f"--as={self.memory_mb * MEGABYTE}")
+            prefix.append("--")
+        if self.nice and _has_tool("nice"):
+            prefix += ["nice", "-n", str(self.nice)]
+        if self.io_class is not None and _has_tool("ionice"):
+            prefix += ["ionice", "-c", str(self.io_class)]
+            if self.io_level is not None:
+                prefix += ["-n", str(self.io_level)]
+        return [*prefix, *cmd]
+
+
+# Resource profiles selectable in the options, from most to least aggressive
+ENCODER_PROFILES = {
+    "normal": EncoderLimits(),
+    "low": EncoderLimits(nice=10, io_class=IO_CLASS_BEST_EFFORT, io_level=7),
+    "idle": EncoderLimits(nice=19, io_class=IO_CLASS_IDLE),
+}
+
+
+@cache
+def _has_tool(name: str) -> bool:
+    """Return True if a utility used to limit encodes is installed."""
+    if shutil.which(name) is None:
+        _LOGGER.warning("%s not found, encodes run without its limits", name)
+        return False
+    return True
+
+
+# Codecs a rendition may use and the container each defaults to
+RENDITION_CODECS = {
+    "libx264": "mp4",
+    "libx265": "mp4",
+    "libvpx-vp9": "webm",
+    "libwebp": "webp",
+    "gif": "gif",
+}
+
+
+@dataclass
+class Rendition:
+    """One output of a timelapse: size, codec, quality and container.
+
+    Quality is the CRF for video codecs and the 0-100 quality for WebP.
+    """
+
+    resolution: str
+    codec: str = "libx264"
+    quality: int | None = None
+    container: str | None = None
+    fps: int | None = None
+
+    def __post_init__(self) -> None:
+        """Validate the rendition."""
+        if self.codec not in RENDITION_CODECS:
+            raise ValueError(f"Unsupported codec: {self.codec}")
+        width, _, height = self.resolution.partition("x")
+        if not (width.isdigit() and height.isdigit()):
+            raise ValueError(f"Invalid resolution: {self.resolution}")
+        self.container = self.container or RENDITION_CODECS[self.codec]
+
+    @property
+    def suffix(self) -> str:
+        """Return the file name suffix distinguishing this rendition."""
+        return f"_{self.resolution}.{self.container}"
+
+    def filter_chain(self, source: str, label: str) -> str:
+        """Return the filter graph turning a split source into this output."""
+        chain = scale_filter(self.resolution)
+        if self.fps:
+            chain += f",fps={self.fps}"
+        if self.codec == "gif":
+            # A palette computed from the clip itself keeps GIFs watchable
+            return (
+                f"[{source}]{chain},split[{label}a][{label}b];"
+                f"[{label}a]palettegen[{label}p];"
+                f"[{label}b][{label}p]paletteuse[{label}]"
+            )
+        return f"[{source}]{chain}[{label}]"
+
+    def codec_args(self, fps: int, threads: int | None = None) -> list[str]:
+        """Return the encoder arguments of this rendition."""
+        fps = self.fps or fps
+        if self.codec == "libx264":
+            args = ["-c:v", "libx264", "-pix_fmt", "yuv420p", "-preset", "medium"]
+            args += ["-crf", str(self.quality or 23), "-g", str(fps * GOP_SECONDS)]
+        elif self.codec == "libx265":
+            args = ["-c:v", "libx265", "-pix_fmt", "yuv420p", "-preset", "medium"]
+            args += ["-crf", str(self.quality or 28), "-tag:v", "hvc1"]
+        elif self.codec == "libvpx-vp9":
+            args = ["-c:v", "libvpx-vp9", "-pix_fmt", "yuv420p", "-b:v", "0"]
+            args += ["-crf", str(self.quality or 33)]
+        elif self.codec == "libwebp":
+            args = ["-c:v", "libwebp", "-quality", str(self.quality or 75)]
+            args += ["-loop", "0"]
+        else:
+            args = ["-loop", "0"]
+        if threads:
+            args += ["-threads", str(threads)]
+        return args
+
+
+def scale_filter(resolution: str) -> str:
+    """Return the scale/pad filter fitting frames into the output resolution."""
+    width, height = resolution.split("x")
+    return (
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2"
+    )
+
+
+def encoder_args(resolution: str, fps: int, threads: int | None = None) -> list[str]:
+    """Return the output encoder arguments shared by every encode."""
+    return [
+        "-vf",
+        scale_filter(resolution),
+        *Rendition(resolution).codec_args(fps, threads),
+    ]
+
+
+def _quote(path: Path) -> str:
+    """Quote a path for an ffconcat file directive."""
+    escaped = str(path.resolve()).replace("'", "'\\''")
+    return f"'{escaped}'"
+
+
+def write_manifest(frames: list[Path], manifest_path: Path, fps: int) -> None:
+    """Write an ffmpeg concat demuxer manifest showing each frame 1/fps."""
+    duration = 1 / fps
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        f.write("ffconcat version 1.0\n")
+        for frame in frames:
+            f.write(f"file {_quote(frame)}\n")
+            f.write(f"duration {duration:.6f}\n")
+        # The concat demuxer ignores the duration of the last entry
+        # unless the file is repeated
+        f.write(f"file {_quote(frames[-1])}\n")
+
+
+def write_concat_list(files: list[Path], list_path: Path) -> None:
+    """Write an ffmpeg concat demuxer list of already encoded videos."""
+    with open(list_path, "w", encoding="utf-8") as f:
+        f.write("ffconcat version 1.0\n")
+        for file in files:
+            f.write(f"file {_quote(file)}\n")
+
+
+def _feed_pipe(feed: Callable[[BinaryIO], None], fd: int) -> bool:
+    """Write ffmpeg's input to a pipe, returning False if reading it failed."""
+    try:
+        with open(fd, "wb") as out:
+            feed(out)
+    except BrokenPipeError:
+        # ffmpeg exited early, its return code tells why
+        return True
+    except OSError as err:
+        _LOGGER.error("Error feeding ffmpeg: %s", err)
+        return False
+    return True
+
+
+async def run_ffmpeg(
+    cmd: list[str],
+    progress: ProgressCallback | None = None,
+    feed: Callable[[BinaryIO], None] | None = None,
+    limits: EncoderLimits | None = None,
+) -> bool:
+    """Run an ffmpeg command as an asyncio subprocess.
+
+    Progress is reported as the number of newly encoded frames. When feed is
+    given, it is run in the executor to write ffmpeg's stdin. Cancelling the
+    calling task kills ffmpeg.
+    """
+    limits = limits or EncoderLimits()
+    cmd = limits.command([cmd[0], "-nostats", "-progress", "pipe:1", *cmd[1:]])
+    _LOGGER.debug("Running ffmpeg command: %s", " ".join(cmd))
+
+    stdin = asyncio.subprocess.DEVNULL
+    write_fd: int | None = None
+    if feed is not None:
+        stdin, write_fd = os.pipe()
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=stdin,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except OSError as err:
+        _LOGGER.error("Error running ffmpeg: %s", err)
+        if write_fd is not None:
+            os.close(write_fd)
+        return False
+    finally:
+        if write_fd is not None:
+            # ffmpeg holds its own copy, so the feeder sees it exit
+            os.close(stdin)
+
+    feeder = None
+    if feed is not None:
+        assert write_fd is not None
+        feeder = asyncio.get_running_loop().run_in_executor(
+            None, _feed_pipe, feed, write_fd
+        )
+
+    stderr: collections.deque[str] = collections.deque(maxlen=20)
+
+    async def read_stderr() -> None:
+        assert process.stderr is not None
+        async for line in process.stderr:
+            stderr.append(line.decode(errors="replace").rstrip())
+
+    async def read_progress() -> None:
+        assert process.stdout is not None
+        reported = 0
+        async for line in process.stdout:
+            key, _, value = line.decode(errors="replace").strip().partition("=")
+            if key != "frame" or not value.isdigit():
+                continue
+            frames = int(value)
+            if progress is not None and frames > reported:
+                progress(frames - reported)
+            reported = max(reported, frames)
+
+    try:
+        await asyncio.gather(read_stderr(), read_progress())
+        returncode = await process.wait()
+        fed = await feeder if feeder is not None else True
+    except asyncio.CancelledError:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    if returncode != 0:
+        _LOGGER.error("ffmpeg failed: %s", "\n".join(stderr))
+        return False
+
+    return fed
+
+
+async def encode_frames(
+    frames: list[Frame],
+    output_path: Path,
+    fps: int,
+    resolution: str,
+    threads: int | None = None,
+    progress: ProgressCallback | None = None,
+    limits: EncoderLimits | None = None,
+) -> bool:
+    """Encode an explicit list of JPEG frames into a video."""
+    if limits is not None:
+        threads = limits.threads(threads)
+    output_args = [
+        "-r",
+        str(fps),
+        *encoder_args(resolution, fps, threads),
+        str(output_path),
+    ]
+    return await _encode(frames, output_path, fps, output_args, progress, limits)
+
+
+async def encode_renditions(
+    frames: list[Frame],
+    outputs: list[tuple[Rendition, Path]],
+    fps: int,
+    threads: int | None = None,
+    progress: ProgressCallback | None = None,
+    limits: EncoderLimits | None = None,
+) -> bool:
+    """Encode frames into several renditions, decoding every frame once.
+
+    The decoded stream is split in the filter graph and each branch is
+    scaled and encoded to its own output by the same ffmpeg process.
+    """
+    if limits is not None:
+        threads = limits.threads(threads)
+    labels = [f"v{index}" for index in range(len(outputs))]
+    graph = [f"[0:v]split={len(outputs)}" + "".join(f"[s{label}]" for label in labels)]
+    output_args: list[str] = []
+    for label, (rendition, path) in zip(labels, outputs):
+        graph.append(rendition.filter_chain(f"s{label}", label))
+        output_args += [
+            "-map",
+            f"[{label}]",
+            "-r",
+            str(rendition.fps or fps),
+            *rendition.codec_args(fps, threads),
+            str(path),
+        ]
+    return await _encode(
+        frames,
+        outputs[0][1],
+        fps,
+        ["-filter_complex", ";".join(graph), *output_args],
+        progress,
+        limits,
+    )
+
+
+async def _encode(
+    frames: list[Frame],
+    output_path: Path,
+    fps: int,
+    output_args: list[str],
+    progress: ProgressCallback | None = None,
+    limits: EncoderLimits | None = None,
+) -> bool:
+    """Run ffmpeg over frames with the given output arguments.
+
+    Loose frames are read through a concat manifest written next to the
+    output. Frames held in packs are streamed to ffmpeg's stdin instead.
+    """
+    if any(frame.offset is not None for frame in frames):
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-f",
+            "image2pipe",
+            "-framerate",
+            str(fps),
+            "-c:v",
+            "mjpeg",
+            "-i",
+            "pipe:0",
+            *output_args,
+        ]
+        return await run_ffmpeg(cmd, progress, partial(write_frames, frames), limits)
+
+    loop = asyncio.get_running_loop()
+    manifest_path = output_path.with_name(f".{output_path.stem}.ffconcat")
+    try:
+        # Only the selected frames are decoded, in the given order
+        await loop.run_in_executor(
+            None,
+            write_manifest,
+            [frame.path for frame in frames],
+            manifest_path,
+            fps,
+        )
+        cmd = [
+            "ffmpeg",
+            "-y",  # Overwrite output file
+            "-f",
+            "concat",
+            "-safe",
+            "0",
+            "-i",
+            str(manifest_path),
+            *output_args,
+        ]
+        return await run_ffmpeg(cmd, progress, limits=limits)
+    finally:
+        manifest_path.unlink(missing_ok=True)
+
+
+async def concat_videos(
+    parts: list[Path], output_path: Path, limits: EncoderLimits | None = None
+) -> bool:
+    """Join videos encoded with identical settings without re-encoding."""
+    loop = asyncio.get_running_loop()
+    list_path = output_path.with_name(f".{output_path.stem}.parts.ffconcat")
+    try:
+        await loop.run_in_executor(None, write_concat_list, parts, list_path)
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-f",
+            "concat",
+            "-safe",
+            "0",
+            "-i",
+            str(list_path),
+            "-c",
+            "copy",
+            "-movflags",
+            "+faststart",
+            str(output_path),
+        ]
+        return await run_ffmpeg(cmd, limits=limits)
+    finally:
+        list_path.unlink(missing_ok=True)
+
+
+async def encode_frames_parallel(
+    frames: list[Frame],
+    output_path: Path,
+    fps: int,
+    resolution: str,
+    workers: int | None = None,
+    progress: ProgressCallback | None = None,
+    limits: EncoderLimits | None = None,
+) -> bool:
+    """Encode contiguous chunks of frames concurrently and join them.
+
+    Falls back to a single encode when there are not enough frames to
+    keep more than one encoder busy.
+    """
+    limits = limits or EncoderLimits()
+    workers = limits.threads(workers or os.cpu_count() or 1)
+    chunks = max(1, min(workers, len(frames) // MIN_CHUNK_FRAMES))
+    if chunks == 1:
+        return await encode_frames(
+            frames, output_path, fps, resolution, progress=progress, limits=limits
+        )
+
+    chunk_size = -(-len(frames) // chunks)
+    threads = max(1, workers // chunks)
+    parts_dir = output_path.with_name(f".{output_path.stem}.chunks")
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    parts = [parts_dir / f"chunk_{index:05d}.mp4" for index in range(chunks)]
+
+    _LOGGER.debug(
+        "Encoding %d frames in %d chunks of %d frames (%d threads each)",
+        len(frames),
+        chunks,
+        chunk_size,
+        threads,
+    )
+
+    try:
+        results = await asyncio.gather(
+            *(
+                encode_frames(
+                    frames[index * chunk_size : (index + 1) * chunk_size],
+                    parts[index],
+                    fps,
+                    resolution,
+                    threads,
+                    progress,
+                    limits,
+                )
+                for index in range(chunks)
+            )
+        )
+        if not all(results):
+            return False
+        return await concat_videos(parts, output_path, limits)
+    finally:
+        for part in parts:
+            part.unlink(missing_ok=True)
+        parts_dir.rmdir()
+
+
+def part_path(output_path: Path) -> Path:
+    """Return the hidden file a live encoder writes before it finishes."""
+    return output_path.with_name(f".{output_path.name}.part")
+
+
+def recover_live_videos(directory: Path, pattern: str) -> list[Path]:
+    """Keep the videos of live encoders that were never finished.
+
+    The fragmented MP4 is playable up to its last complete fragment.
+    """
+    recovered = []
+    for path in sorted(directory.glob(part_path(Path(pattern)).name)):
+        if path.stat().st_size == 0:
+            path.unlink()
+            continue
+        output_path = path.with_name(path.name[1 : -len(".part")])
+        if output_path.exists():
+            output_path = output_path.with_stem(f"{output_path.stem}_recovered")
+        path.replace(output_path)
+        recovered.append(output_path)
+    return recovered
+
+
+class LiveEncoder:
+    """Long-running ffmpeg process encoding frames as they are captured."""
+
+    def __init__(
+        self,
+        output_path: Path,
+        fps: int,
+        resolution: str,
+        limits: EncoderLimits | None = None,
+        threads: int | None = None,
+    ) -> None:
+        """Initialize the live encoder."""
+        self.output_path = output_path
+        self.fps = fps
+        self.resolution = resolution
+        self.threads = threads
+        # The encoder runs for the whole session, so no CPU time budget fits
+        self.limits = replace(limits or EncoderLimits(), cpu_seconds=None)
+        self.frames = 0
+
+        self._part_path = part_path(output_path)
+        self._process: asyncio.subprocess.Process | None = None
+        self._stderr: collections.deque[str] = collections.deque(maxlen=20)
+        self._stderr_task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        """Return True while ffmpeg accepts frames."""
+        return self._process is not None and self._process.returncode is None
+
+    async def start(self) -> None:
+        """Start the ffmpeg process reading JPEG frames from stdin."""
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        cmd = self.limits.command(
+            [
+                "ffmpeg",
+                "-y",
+                "-loglevel",
+                "error",
+                "-f",
+                "image2pipe",
+                "-framerate",
+                str(self.fps),
+                "-c:v",
+                "mjpeg",
+                "-i",
+                "-",
+                *encoder_args(
+                    self.resolution, self.fps, self.limits.threads(self.threads)
+                ),
+                # Fragments keep the video playable if ffmpeg is killed
+                "-movflags",
+                "+frag_keyframe+empty_moov",
+                "-f",
+                "mp4",
+                str(self._part_path),
+            ]
+        )
+        _LOGGER.debug("Starting live encoder: %s", " ".join(cmd))
+
+        self._process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        self._stderr_task = asyncio.create_task(self._read_stderr())
+
+    async def _read_stderr(self) -> None:
+        """Keep the tail of ffmpeg's error output without filling the pipe."""
+        assert self._process is not None and self._process.stderr is not None
+        async for line in self._process.stderr:
+            self._stderr.append(line.decode(errors="replace").rstrip())
+
+    async def add_frame(self, data: bytes) -> bool:
+        """Feed a JPEG frame to the encoder."""
+        if not self.running:
+            return False
+
+        assert self._process is not None and self._process.stdin is not None
+        try:
+            self._process.stdin.write(data)
+            await self._process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as err:
+            _LOGGER.error(
+                "Live encoder stopped accepting frames: %s %s",
+                err,
+                " ".join(self._stderr),
+            )
+            return False
+
+        self.frames += 1
+        return True
+
+    async def finish(self) -> bool:
+        """Close the input and wait for ffmpeg to finalize the video."""
+        if self._process is None:
+            return False
+
+        process = self._process
+        self._process = None
+
+        if process.stdin is not None and not process.stdin.is_closing():
+            process.stdin.close()
+        returncode = await process.wait()
+        if self._stderr_task is not None:
+            await self._stderr_task
+
+        if returncode != 0 or self.frames == 0:
+            _LOGGER.error(
+                "Live encoder failed (%s): %s", returncode, " ".join(self._stderr)
+            )
+            self._part_path.unlink(missing_ok=True)
+            return False
+
+        self._part_path.replace(self.output_path)
+        return True
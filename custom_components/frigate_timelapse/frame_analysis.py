@@ -0,0 +1,127 @@
+"""Cheap per-frame image analysis on reduced JPEG decodes."""
+
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Size of the difference hash grid, giving HASH_SIZE * HASH_SIZE bits
+HASH_SIZE = 8
+
+# Resolution statistics are measured at, enough to tell blur from detail
+STATS_SIZE = (160, 90)
+
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+
+# Bytes searched for the end marker, as some encoders pad after it
+EOI_SEARCH_BYTES = 64
+
+# Mean luminance below which a frame is considered black
+BLACK_LUMINANCE = 8.0
+
+# Reasons a frame fails the quality gate
+DEFECT_CORRUPT = "corrupt"
+DEFECT_TRUNCATED = "truncated"
+DEFECT_BLACK = "black"
+FRAME_DEFECTS = (DEFECT_CORRUPT, DEFECT_TRUNCATED, DEFECT_BLACK)
+
+
+@dataclass
+class FrameStatistics:
+    """Cheap measurements of a frame used to select frames without decoding."""
+
+    luminance: float
+    contrast: float
+    sharpness: float
+
+
+def _reduced_grayscale(data: bytes | Path, size: tuple[int, int]) -> Image.Image:
+    """Decode a JPEG at reduced scale and return it as a small grayscale image.
+
+    draft() lets the JPEG decoder skip most of the DCT work by decoding
+    straight to a fraction of the full resolution.
+    """
+    source = io.BytesIO(data) if isinstance(data, bytes) else data
+    with Image.open(source) as image:
+        image.draft("L", (size[0] * 4, size[1] * 4))
+        return image.convert("L").resize(size, Image.Resampling.BILINEAR)
+
+
+class FrameRejected(Exception):
+    """Raised when a captured frame fails the quality gate."""
+
+    def __init__(self, defect: str) -> None:
+        """Initialize the exception with the defect found."""
+        super().__init__(f"{defect} frame")
+        self.defect = defect
+
+
+def check_jpeg(data: bytes | Path) -> str | None:
+    """Return the structural defect of a JPEG frame, or None if it is sound.
+
+    Only the markers and the header are read, nothing is decoded.
+    """
+    if isinstance(data, bytes):
+        head, tail = data[:2], data[-EOI_SEARCH_BYTES:]
+    else:
+        with open(data, "rb") as f:
+            head = f.read(2)
+            f.seek(max(0, f.seek(0, io.SEEK_END) - EOI_SEARCH_BYTES))
+            tail = f.read()
+    if head != JPEG_SOI:
+        return DEFECT_CORRUPT
+    if JPEG_EOI not in tail:
+        return DEFECT_TRUNCATED
+
+    try:
+        with Image.open(io.BytesIO(data) if isinstance(data, bytes) else data) as image:
+            if image.format != "JPEG" or not all(image.size):
+                return DEFECT_CORRUPT
+    except (OSError, SyntaxError):
+        return DEFECT_CORRUPT
+    return None
+
+
+def analyze_frame(data: bytes | Path) -> tuple[int, FrameStatistics]:
+    """Return the perceptual hash and statistics of a frame from one decode.
+
+    Luminance is the mean pixel value, contrast its standard deviation and
+    sharpness the variance of the Laplacian, all on a 0-255 grayscale.
+    """
+    image = _reduced_grayscale(data, STATS_SIZE)
+    pixels = np.asarray(image, dtype=np.float32)
+    laplacian = (
+        pixels[:-2, 1:-1]
+        + pixels[2:, 1:-1]
+        + pixels[1:-1, :-2]
+        + pixels[1:-1, 2:]
+        - 4 * pixels[1:-1, 1:-1]
+    )
+    statistics = FrameStatistics(
+        luminance=round(float(pixels.mean()), 2),
+        contrast=round(float(pixels.std()), 2),
+        sharpness=round(float(laplacian.var()), 2),
+    )
+    hash_image = image.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BILINEAR)
+    return _difference_hash(hash_image), statistics
+
+
+def _difference_hash(image: Image.Image) -> int:
+    """Return the difference hash of a (HASH_SIZE + 1) x HASH_SIZE image."""
+    pixels = list(image.getdata())
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hash_distance(first: int, second: int) -> int:
+    """Return the number of differing bits between two hashes."""
+    return (first ^ second).bit_count()
@@ -0,0 +1,629 @@
+"""Persistent SQLite catalog of captured frames."""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+_LOGGER = logging.getLogger(__name__)
+
+FRAME_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S_%f"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frames (
+    id INTEGER PRIMARY KEY,
+    camera TEXT NOT NULL,
+    session TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    duplicate INTEGER NOT NULL DEFAULT 0,
+    offset INTEGER,
+    tier INTEGER NOT NULL DEFAULT 0,
+    luminance REAL,
+    contrast REAL,
+    sharpness REAL
+);
+CREATE INDEX IF NOT EXISTS idx_frames_camera_time
+    ON frames (camera, timestamp);
+CREATE INDEX IF NOT EXISTS idx_frames_camera_session
+    ON frames (camera, session, timestamp);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    camera TEXT NOT NULL,
+    session TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    frame_count INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    params TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_segments_camera_session
+    ON segments (camera, session, start);
+"""
+
+# Columns added after the first release, created on existing catalogs
+FRAME_COLUMNS = {
+    "duplicate": "INTEGER NOT NULL DEFAULT 0",
+    "offset": "INTEGER",
+    "tier": "INTEGER NOT NULL DEFAULT 0",
+    "luminance": "REAL",
+    "contrast": "REAL",
+    "sharpness": "REAL",
+}
+
+# Largest number of ids bound in a single IN (...) query
+MAX_QUERY_IDS = 500
+
+# Indexes on migrated columns, created once the columns exist
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_frames_location
+    ON frames (path, offset);
+"""
+
+FRAME_SELECT = (
+    "SELECT camera, session, timestamp, path, size, duplicate, offset, id, "
+    "luminance, contrast, sharpness FROM frames "
+)
+
+# Columns returned by get_frame_index, in order
+INDEX_COLUMNS = ("id", "timestamp", "size", "luminance", "contrast", "sharpness")
+
+SESSION_FORMAT = "%Y%m%d_%H%M%S"
+
+
+def session_dir(output_path: Path, camera: str, session: str) -> Path:
+    """Return the directory holding the frames of a camera's session."""
+    return output_path / "captures" / camera / session
+
+
+def find_flat_sessions(output_path: Path) -> list[Path]:
+    """Return session directories of older versions, not split by camera."""
+    captures_path = output_path / "captures"
+    if not captures_path.exists():
+        return []
+    sessions = []
+    for path in captures_path.iterdir():
+        try:
+            datetime.strptime(path.name, SESSION_FORMAT)
+        except ValueError:
+            continue
+        if path.is_dir():
+            sessions.append(path)
+    return sorted(sessions)
+
+
+def adopt_flat_sessions(output_path: Path, camera: str) -> int:
+    """Move sessions of older versions under a camera, returning how many.
+
+    Only valid when the camera is the only one using the output path, as
+    older versions did not record which camera captured a session.
+    """
+    adopted = 0
+    for path in find_flat_sessions(output_path):
+        target = session_dir(output_path, camera, path.name)
+        if target.exists():
+            _LOGGER.warning("Not moving %s, %s already exists", path, target)
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        path.rename(target)
+        adopted += 1
+    if adopted:
+        _LOGGER.info("Moved %d sessions of older versions under %s", adopted, camera)
+    return adopted
+
+
+@dataclass
+class Frame:
+    """A captured frame recorded in the catalog."""
+
+    camera: str
+    session: str
+    timestamp: datetime
+    path: Path
+    size: int
+    # Near-duplicate frames point at the last kept frame, whose location and
+    # size they share, instead of storing data of their own
+    duplicate: bool = False
+    # Position of the JPEG data inside a pack file, None for loose files
+    offset: int | None = None
+    frame_id: int | None = field(default=None, compare=False)
+    # Statistics measured at capture time, see frame_analysis
+    luminance: float | None = None
+    contrast: float | None = None
+    sharpness: float | None = None
+
+
+@dataclass
+class Segment:
+    """An immutable encoded video covering a closed range of frames."""
+
+    camera: str
+    session: str
+    start: datetime
+    end: datetime
+    frame_count: int
+    path: Path
+    params: str
+
+
+class FrameCatalog:
+    """Indexed on-disk catalog of captured frames.
+
+    All methods are blocking and must be run in the executor.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        """Initialize the catalog."""
+        self.db_path = db_path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def open(self) -> None:
+        """Open the catalog, creating it if needed."""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._conn.executescript(INDEXES)
+        self._conn.commit()
+
+    def _migrate(self) -> None:
+        """Add columns missing from catalogs created by older versions."""
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(frames)")}
+        for column, definition in FRAME_COLUMNS.items():
+            if column not in existing:
+                self.conn.execute(
+                    f"ALTER TABLE frames ADD COLUMN {column} {definition}"
+                )
+
+    def close(self) -> None:
+        """Close the catalog."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Return the open connection."""
+        if self._conn is None:
+            raise RuntimeError("Frame catalog is not open")
+        return self._conn
+
+    def add_frame(self, frame: Frame) -> None:
+        """Record a newly captured frame."""
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO frames "
+                "(camera, session, timestamp, path, size, duplicate, offset, "
+                "luminance, contrast, sharpness) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    frame.camera,
+                    frame.session,
+                    frame.timestamp.timestamp(),
+                    str(frame.path),
+                    frame.size,
+                    frame.duplicate,
+                    frame.offset,
+                    frame.luminance,
+                    frame.contrast,
+                    frame.sharpness,
+                ),
+            )
+            self.conn.commit()
+
+    def get_frames(
+        self,
+        camera: str,
+        session: str | None = None,
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+    ) -> list[Frame]:
+        """Return frames for a camera ordered by capture time."""
+        where, params = self._where(camera, session, start_time, end_time)
+        return self._select(where + " ORDER BY timestamp", params)
+
+    def get_frame_index(
+        self,
+        camera: str,
+        session: str | None = None,
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> list[tuple]:
+        """Return INDEX_COLUMNS of matching frames without building Frames.
+
+        Offset and limit select a page of the frames in capture order.
+        """
+        where, params = self._where(camera, session, start_time, end_time)
+        # A negative limit means no limit to SQLite
+        params += [-1 if limit is None else limit, offset]
+        with self._lock:
+            return self.conn.execute(
+                f"SELECT {', '.join(INDEX_COLUMNS)} FROM frames "
+                + where
+                + " ORDER BY timestamp LIMIT ? OFFSET ?",
+                params,
+            ).fetchall()
+
+    def get_frames_by_id(self, frame_ids: list[int]) -> list[Frame]:
+        """Return the frames with the given ids ordered by capture time."""
+        frames: list[Frame] = []
+        for first in range(0, len(frame_ids), MAX_QUERY_IDS):
+            ids = frame_ids[first : first + MAX_QUERY_IDS]
+            frames += self._select(f"WHERE id IN ({', '.join('?' * len(ids))})", ids)
+        frames.sort(key=lambda frame: frame.timestamp)
+        return frames
+
+    def _select(self, clause: str, params: list) -> list[Frame]:
+        """Return the frames matched by a WHERE/ORDER clause."""
+        with self._lock:
+            rows = self.conn.execute(FRAME_SELECT + clause, params).fetchall()
+        return [
+            Frame(
+                camera=row[0],
+                session=row[1],
+                timestamp=datetime.fromtimestamp(row[2]),
+                path=Path(row[3]),
+                size=row[4],
+                duplicate=bool(row[5]),
+                offset=row[6],
+                frame_id=row[7],
+                luminance=row[8],
+                contrast=row[9],
+                sharpness=row[10],
+            )
+            for row in rows
+        ]
+
+    def get_thinning_candidates(
+        self, camera: str, tier: int, before: datetime, limit: int
+    ) -> list[Frame]:
+        """Return the oldest frames captured before a time not yet at a tier."""
+        return self._select(
+            "WHERE camera = ? AND tier < ? AND timestamp < ? "
+            "ORDER BY timestamp LIMIT ?",
+            [camera, tier, before.timestamp(), limit],
+        )
+
+    def get_last_kept(
+        self, camera: str, tier: int, before: datetime
+    ) -> datetime | None:
+        """Return the newest frame before a time already kept at a tier."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT MAX(timestamp) FROM frames "
+                "WHERE camera = ? AND tier >= ? AND timestamp < ?",
+                (camera, tier, before.timestamp()),
+            ).fetchone()
+        return datetime.fromtimestamp(row[0]) if row[0] is not None else None
+
+    def set_tier(self, frame_ids: list[int], tier: int) -> None:
+        """Mark frames as kept by a thinning tier."""
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE frames SET tier = ? WHERE id = ?",
+                [(tier, frame_id) for frame_id in frame_ids],
+            )
+            self.conn.commit()
+
+    def get_oldest_frames(
+        self, camera: str, limit: int, exclude_path: Path | None = None
+    ) -> list[Frame]:
+        """Return the oldest frames of a camera, optionally skipping a file."""
+        return self._select(
+            "WHERE camera = ? AND path != ? ORDER BY timestamp LIMIT ?",
+            [camera, str(exclude_path or ""), limit],
+        )
+
+    def delete_frames(self, frames: list[Frame]) -> list[Frame]:
+        """Forget frames, returning those whose data nothing refers to anymore.
+
+        When a deleted frame is repeated by a remaining duplicate, the
+        earliest duplicate takes over its data instead.
+        """
+        released = []
+        with self._lock:
+            self.conn.executemany(
+                "DELETE FROM frames WHERE id = ?",
+                [(frame.frame_id,) for frame in frames],
+            )
+            for frame in frames:
+                if frame.duplicate:
+                    continue
+                row = self.conn.execute(
+                    "SELECT id FROM frames WHERE path = ? AND offset IS ? "
+                    "ORDER BY timestamp LIMIT 1",
+                    (str(frame.path), frame.offset),
+                ).fetchone()
+                if row is None:
+                    released.append(frame)
+                else:
+                    self.conn.execute(
+                        "UPDATE frames SET duplicate = 0 WHERE id = ?", (row[0],)
+                    )
+            self.conn.commit()
+        return released
+
+    def get_loose_size(self, camera: str) -> int:
+        """Return the bytes held by a camera's frames stored as loose files."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT SUM(size) FROM frames "
+                "WHERE camera = ? AND duplicate = 0 AND offset IS NULL",
+                (camera,),
+            ).fetchone()
+        return row[0] or 0
+
+    def get_files(self, camera: str) -> list[Path]:
+        """Return the pack and segment files holding a camera's data."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT path FROM frames "
+                "WHERE camera = ? AND offset IS NOT NULL "
+                "UNION SELECT path FROM segments WHERE camera = ?",
+                (camera, camera),
+            ).fetchall()
+        return [Path(row[0]) for row in rows]
+
+    def get_pack_records(self, pack_path: Path) -> list[tuple[datetime, int, int]]:
+        """Return (timestamp, offset, length) of the live records of a pack."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT timestamp, offset, size FROM frames "
+                "WHERE path = ? AND duplicate = 0 ORDER BY offset",
+                (str(pack_path),),
+            ).fetchall()
+        return [(datetime.fromtimestamp(row[0]), row[1], row[2]) for row in rows]
+
+    def move_records(self, pack_path: Path, moves: list[tuple[int, int]]) -> None:
+        """Apply (old, new) offsets of a rewritten pack, in ascending order."""
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE frames SET offset = ? WHERE path = ? AND offset = ?",
+                [(new, str(pack_path), old) for old, new in moves],
+            )
+            self.conn.commit()
+
+    def count_frames(
+        self,
+        camera: str,
+        session: str | None = None,
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+    ) -> int:
+        """Return the number of frames matching the given filters."""
+        where, params = self._where(camera, session, start_time, end_time)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) FROM frames " + where, params
+            ).fetchone()
+        return row[0]
+
+    def get_sessions(self, camera: str) -> list[str]:
+        """Return the sessions of a camera, oldest first."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT session FROM frames WHERE camera = ? "
+                "GROUP BY session ORDER BY MIN(timestamp)",
+                (camera,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_sessions_before(self, camera: str, cutoff: datetime) -> list[str]:
+        """Return sessions whose newest frame is older than the cutoff."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT session FROM frames WHERE camera = ? "
+                "GROUP BY session HAVING MAX(timestamp) < ?",
+                (camera, cutoff.timestamp()),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete_session(self, camera: str, session: str) -> None:
+        """Forget all frames and segments of a session."""
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM frames WHERE camera = ? AND session = ?",
+                (camera, session),
+            )
+            self.conn.execute(
+                "DELETE FROM segments WHERE camera = ? AND session = ?",
+                (camera, session),
+            )
+            self.conn.commit()
+
+    def delete_segments_before(self, camera: str, cutoff: datetime) -> list[Path]:
+        """Forget segments ending before a time, returning their files."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT path FROM segments WHERE camera = ? AND end < ?",
+                (camera, cutoff.timestamp()),
+            ).fetchall()
+            self.conn.execute(
+                "DELETE FROM segments WHERE camera = ? AND end < ?",
+                (camera, cutoff.timestamp()),
+            )
+            self.conn.commit()
+        return [Path(row[0]) for row in rows]
+
+    def add_segment(self, segment: Segment) -> None:
+        """Record an encoded segment."""
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO segments "
+                "(camera, session, start, end, frame_count, path, params) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    segment.camera,
+                    segment.session,
+                    segment.start.timestamp(),
+                    segment.end.timestamp(),
+                    segment.frame_count,
+                    str(segment.path),
+                    segment.params,
+                ),
+            )
+            self.conn.commit()
+
+    def get_segments(
+        self,
+        camera: str,
+        session: str,
+        params: str,
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+    ) -> list[Segment]:
+        """Return segments entirely inside the given range, by start time."""
+        clauses = ["camera = ?", "session = ?", "params = ?"]
+        values: list = [camera, session, params]
+        if start_time is not None:
+            clauses.append("start >= ?")
+            values.append(start_time.timestamp())
+        if end_time is not None:
+            clauses.append("end <= ?")
+            values.append(end_time.timestamp())
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT camera, session, start, end, frame_count, path, params "
+                "FROM segments WHERE " + " AND ".join(clauses) + " ORDER BY start",
+                values,
+            ).fetchall()
+        return [
+            Segment(
+                camera=row[0],
+                session=row[1],
+                start=datetime.fromtimestamp(row[2]),
+                end=datetime.fromtimestamp(row[3]),
+                frame_count=row[4],
+                path=Path(row[5]),
+                params=row[6],
+            )
+            for row in rows
+        ]
+
+    def get_segments_end(
+        self, camera: str, session: str, params: str
+    ) -> datetime | None:
+        """Return the capture time of the last frame covered by a segment."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT MAX(end) FROM segments "
+                "WHERE camera = ? AND session = ? AND params = ?",
+                (camera, session, params),
+            ).fetchone()
+        return datetime.fromtimestamp(row[0]) if row[0] is not None else None
+
+    def _sessions(self, camera: str) -> set[str]:
+        """Return the sessions of a camera with frames in the catalog."""
+        rows = self.conn.execute(
+            "SELECT DISTINCT session FROM frames WHERE camera = ?", (camera,)
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def rebuild(self, output_path: Path, camera: str) -> int:
+        """Index a camera's sessions missing from the catalog, returning frames added.
+
+        Only session directories the catalog knows nothing about are read,
+        so this is cheap once everything is indexed. Entries setting up
+        together serialize on the database, and sessions are checked again
+        in the transaction adding their rows.
+        """
+        # Imported here as frame_store depends on this module
+        from .frame_store import PACK_GLOB, iter_pack_records
+
+        with self._lock:
+            known = self._sessions(camera)
+
+        rows = []
+        camera_path = output_path / "captures" / camera
+        if camera_path.exists():
+            for session_path in camera_path.iterdir():
+                if not session_path.is_dir() or session_path.name in known:
+                    continue
+                for image in session_path.glob("frame_*.jpg"):
+                    try:
+                        timestamp = datetime.strptime(
+                            image.stem.replace("frame_", ""), FRAME_TIMESTAMP_FORMAT
+                        )
+                        size = image.stat().st_size
+                    except (ValueError, OSError):
+                        continue
+                    rows.append(
+                        (
+                            camera,
+                            session_path.name,
+                            timestamp.timestamp(),
+                            str(image),
+                            size,
+                            None,
+                        )
+                    )
+                for pack in session_path.glob(PACK_GLOB):
+                    try:
+                        records = list(iter_pack_records(pack))
+                    except OSError:
+                        continue
+                    rows.extend(
+                        (
+                            camera,
+                            session_path.name,
+                            timestamp.timestamp(),
+                            str(pack),
+                            length,
+                            offset,
+                        )
+                        for timestamp, offset, length in records
+                    )
+
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another entry of the camera may have indexed some meanwhile
+                known = self._sessions(camera)
+                rows = [row for row in rows if row[1] not in known]
+                conn.executemany(
+                    "INSERT INTO frames "
+                    "(camera, session, timestamp, path, size, offset) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+        if rows:
+            _LOGGER.info("Indexed %d frames of %s found on disk", len(rows), camera)
+        return len(rows)
+
+    @staticmethod
+    def _where(
+        camera: str,
+        session: str | None,
+        start_time: datetime | None,
+        end_time: datetime | None,
+    ) -> tuple[str, list]:
+        """Build a WHERE clause for the common frame filters."""
+        clauses = ["camera = ?"]
+        params: list = [camera]
+        if session is not None:
+            clauses.append("session = ?")
+            params.append(session)
+        if start_time is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start_time.timestamp())
+        if end_time is not None:
+            clauses.append("timestamp <= ?")
+            params.append(end_time.timestamp())
+        return "WHERE " + " AND ".join(clauses), params
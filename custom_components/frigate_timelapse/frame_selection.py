@@ -0,0 +1,164 @@
+"""Frame selection over catalog statistics, vectorized with NumPy."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+# Longest pause between captures that sampling treats as elapsed time
+SAMPLE_MAX_GAP = 3600  # seconds
+
+# Mean luminance below which a frame counts as dark (night, lens covered)
+DARK_LUMINANCE = 40.0
+
+# Share of the least sharp frames dropped as blurry (rain, fog, motion)
+BLURRY_QUANTILE = 0.25
+
+POLICY_EXCLUDE_DARK = "exclude_dark"
+POLICY_EXCLUDE_BLURRY = "exclude_blurry"
+POLICY_SHARPEST_PER_DAY = "sharpest_per_day"
+POLICY_BRIGHTEST_PER_DAY = "brightest_per_day"
+POLICY_BEST_PER_DAY = "best_per_day"
+
+
+@dataclass
+class FrameIndex:
+    """Column arrays of the catalog index, see FrameCatalog.get_frame_index.
+
+    Statistics missing for frames captured before they were measured are
+    NaN, which no filter drops and no ranking prefers.
+    """
+
+    ids: np.ndarray
+    timestamps: np.ndarray
+    sizes: np.ndarray
+    luminance: np.ndarray
+    contrast: np.ndarray
+    sharpness: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple]) -> FrameIndex:
+        """Build the arrays from index rows."""
+        columns = np.array(rows, dtype=np.float64).reshape(-1, 6).T
+        return cls(
+            ids=columns[0].astype(np.int64),
+            timestamps=columns[1],
+            sizes=columns[2],
+            luminance=columns[3],
+            contrast=columns[4],
+            sharpness=columns[5],
+        )
+
+    def local_days(self) -> np.ndarray:
+        """Return the local calendar day number of every frame."""
+        # UTC offsets only change on the hour, so look them up once per hour
+        hours, inverse = np.unique(self.timestamps // 3600, return_inverse=True)
+        offsets = np.array(
+            [
+                datetime.fromtimestamp(hour * 3600)
+                .astimezone()
+                .utcoffset()
+                .total_seconds()
+                for hour in hours
+            ]
+        )
+        return (self.timestamps + offsets[inverse]) // 86400
+
+
+def _rank(values: np.ndarray) -> np.ndarray:
+    """Return values as ranks in [0, 1], with NaN ranked lowest."""
+    filled = np.where(np.isnan(values), -np.inf, values)
+    return np.argsort(np.argsort(filled)) / max(1, len(values) - 1)
+
+
+def _best_per_day(index: FrameIndex, keep: np.ndarray, score: np.ndarray) -> np.ndarray:
+    """Keep only the highest scoring frame of each day."""
+    candidates = np.flatnonzero(keep)
+    if not len(candidates):
+        return keep
+    days = index.local_days()[candidates]
+    scores = np.where(np.isnan(score[candidates]), -np.inf, score[candidates])
+    # Sort by day, then by descending score, and take each day's first
+    order = np.lexsort((-scores, days))
+    _, first = np.unique(days[order], return_index=True)
+    result = np.zeros_like(keep)
+    result[candidates[order[first]]] = True
+    return result
+
+
+def _exclude_dark(index: FrameIndex, keep: np.ndarray) -> np.ndarray:
+    """Drop frames too dark to show anything."""
+    return keep & ~(index.luminance < DARK_LUMINANCE)
+
+
+def _exclude_blurry(index: FrameIndex, keep: np.ndarray) -> np.ndarray:
+    """Drop the least sharp frames among those still selected."""
+    sharpness = index.sharpness[keep]
+    if not np.any(~np.isnan(sharpness)):
+        return keep
+    threshold = np.nanquantile(sharpness, BLURRY_QUANTILE)
+    return keep & ~(index.sharpness < threshold)
+
+
+def _sharpest_per_day(index: FrameIndex, keep: np.ndarray) -> np.ndarray:
+    """Keep the sharpest frame of each day."""
+    return _best_per_day(index, keep, index.sharpness)
+
+
+def _brightest_per_day(index: FrameIndex, keep: np.ndarray) -> np.ndarray:
+    """Keep the brightest frame of each day."""
+    return _best_per_day(index, keep, index.luminance)
+
+
+def _balanced_per_day(index: FrameIndex, keep: np.ndarray) -> np.ndarray:
+    """Keep the sharpest, most contrasted daylight frame of each day."""
+    keep = _exclude_dark(index, keep)
+    return _best_per_day(index, keep, _rank(index.sharpness) + _rank(index.contrast))
+
+
+SELECTION_POLICIES: dict[str, Callable[[FrameIndex, np.ndarray], np.ndarray]] = {
+    POLICY_EXCLUDE_DARK: _exclude_dark,
+    POLICY_EXCLUDE_BLURRY: _exclude_blurry,
+    POLICY_SHARPEST_PER_DAY: _sharpest_per_day,
+    POLICY_BRIGHTEST_PER_DAY: _brightest_per_day,
+    POLICY_BEST_PER_DAY: _balanced_per_day,
+}
+
+
+def sample_evenly(timestamps: np.ndarray, count: int) -> np.ndarray:
+    """Return positions of at most count frames spread evenly over time.
+
+    Pauses between captures count as at most SAMPLE_MAX_GAP, so nights or
+    stopped sessions do not eat into the frame budget.
+    """
+    if len(timestamps) <= count:
+        return np.arange(len(timestamps))
+    gaps = np.minimum(np.diff(timestamps), SAMPLE_MAX_GAP)
+    elapsed = np.concatenate(([0.0], np.cumsum(gaps)))
+    targets = np.linspace(0.0, elapsed[-1], count)
+    positions = np.minimum(np.searchsorted(elapsed, targets), len(elapsed) - 1)
+    return np.unique(positions)
+
+
+def select_frames(
+    rows: Sequence[tuple], policies: Sequence[str] = (), count: int | None = None
+) -> list[int]:
+    """Return the ids of the frames chosen by policies and a frame budget.
+
+    Policies are applied in order to the index rows, then the budget
+    samples evenly among the frames left.
+    """
+    if not rows:
+        return []
+    index = FrameIndex.from_rows(rows)
+    keep = np.ones(len(index.ids), dtype=bool)
+    for policy in policies:
+        keep = SELECTION_POLICIES[policy](index, keep)
+
+    positions = np.flatnonzero(keep)
+    if count:
+        positions = positions[sample_evenly(index.timestamps[positions], count)]
+    return index.ids[positions].tolist()
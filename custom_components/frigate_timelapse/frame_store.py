@@ -0,0 +1,199 @@
+"""Packed append-only storage for captured frames."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import mmap
+import os
+import struct
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO
+
+from .frame_catalog import FRAME_TIMESTAMP_FORMAT, Frame
+
+_LOGGER = logging.getLogger(__name__)
+
+# Record header: capture timestamp (epoch seconds) and JPEG length
+RECORD_HEADER = struct.Struct(">dI")
+
+# Size at which a session starts a new pack file
+PACK_MAX_BYTES = 256 * 1024 * 1024
+
+PACK_GLOB = "pack_*.bin"
+
+# Longest wait for frame reads to end before a pack rewrite gives up
+WRITE_WAIT = 5.0  # seconds
+
+
+class FrameLock:
+    """Per-camera lock between frame readers and retention.
+
+    Captures, encodes and the frame views read frames under read(), any
+    number at once. Retention deletes frames and rewrites packs under
+    write(), which waits for reads in progress and gives up if they last
+    too long. The generation changes with every write, so frames loaded
+    before it must be loaded again before reading their data.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the lock."""
+        self.generation = 0
+        self._readers = 0
+        self._writing = False
+        self._changed = asyncio.Condition()
+
+    @asynccontextmanager
+    async def read(self) -> AsyncIterator[None]:
+        """Hold the lock shared while frame data is read."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: not self._writing)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._changed:
+                self._readers -= 1
+                self._changed.notify_all()
+
+    @asynccontextmanager
+    async def write(self, timeout: float = WRITE_WAIT) -> AsyncIterator[bool]:
+        """Hold the lock exclusively, yielding False if reads did not end."""
+        acquired = await self._acquire_write(timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                async with self._changed:
+                    self._writing = False
+                    self.generation += 1
+                    self._changed.notify_all()
+
+    async def _acquire_write(self, timeout: float) -> bool:
+        """Block new reads and wait for those in progress to end."""
+        async with self._changed:
+            if self._writing:
+                return False
+            self._writing = True
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: not self._readers), timeout
+                )
+            except asyncio.TimeoutError:
+                self._writing = False
+                self._changed.notify_all()
+                return False
+        return True
+
+
+class PackedFrameStore:
+    """Append frames as length-prefixed records to rolling pack files.
+
+    All methods are blocking and must be run in the executor.
+    """
+
+    def __init__(self, max_bytes: int = PACK_MAX_BYTES) -> None:
+        """Initialize the store."""
+        self.max_bytes = max_bytes
+
+    def append(
+        self, session_path: Path, timestamp: datetime, data: bytes
+    ) -> tuple[Path, int]:
+        """Append a frame, returning its pack file and data offset."""
+        packs = sorted(session_path.glob(PACK_GLOB))
+        pack_path = packs[-1] if packs else session_path / "pack_00000.bin"
+        if pack_path.exists() and (
+            pack_path.stat().st_size + RECORD_HEADER.size + len(data) > self.max_bytes
+        ):
+            # Number after the last pack, as retention may delete older ones
+            index = int(pack_path.stem.removeprefix("pack_")) + 1
+            pack_path = session_path / f"pack_{index:05d}.bin"
+
+        with open(pack_path, "ab") as f:
+            offset = f.tell() + RECORD_HEADER.size
+            f.write(RECORD_HEADER.pack(timestamp.timestamp(), len(data)))
+            f.write(data)
+
+        return pack_path, offset
+
+
+def iter_pack_records(pack_path: Path) -> Iterator[tuple[datetime, int, int]]:
+    """Yield (timestamp, offset, length) of every complete record in a pack.
+
+    A trailing record cut short by a crash is ignored.
+    """
+    file_size = pack_path.stat().st_size
+    with open(pack_path, "rb") as f:
+        position = 0
+        while position + RECORD_HEADER.size <= file_size:
+            timestamp, length = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+            offset = position + RECORD_HEADER.size
+            if offset + length > file_size:
+                _LOGGER.warning("Ignoring truncated record in %s", pack_path)
+                return
+            yield datetime.fromtimestamp(timestamp), offset, length
+            position = f.seek(length, os.SEEK_CUR)
+
+
+def compact_pack(
+    pack_path: Path, records: list[tuple[datetime, int, int]]
+) -> list[tuple[int, int]]:
+    """Rewrite a pack with only the given (timestamp, offset, length) records.
+
+    Records must be in offset order. Returns the (old, new) offset of each.
+    """
+    temp_path = pack_path.with_name(f".{pack_path.name}.compact")
+    moves = []
+    with open(pack_path, "rb") as src, open(temp_path, "wb") as dst:
+        for timestamp, offset, length in records:
+            dst.write(RECORD_HEADER.pack(timestamp.timestamp(), length))
+            moves.append((offset, dst.tell()))
+            dst.write(os.pread(src.fileno(), length, offset))
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(temp_path, pack_path)
+    return moves
+
+
+def read_frame(frame: Frame) -> bytes:
+    """Return the JPEG bytes of a frame, loose or packed."""
+    if frame.offset is None:
+        return frame.path.read_bytes()
+    with open(frame.path, "rb") as f:
+        return os.pread(f.fileno(), frame.size, frame.offset)
+
+
+def write_frames(frames: list[Frame], out: BinaryIO) -> None:
+    """Write frames back to back, slicing packs through mmap without copies."""
+    maps: dict[Path, mmap.mmap] = {}
+    try:
+        for frame in frames:
+            if frame.offset is None:
+                out.write(frame.path.read_bytes())
+                continue
+            if (pack := maps.get(frame.path)) is None:
+                with open(frame.path, "rb") as f:
+                    pack = maps[frame.path] = mmap.mmap(
+                        f.fileno(), 0, access=mmap.ACCESS_READ
+                    )
+            with memoryview(pack) as view:
+                out.write(view[frame.offset : frame.offset + frame.size])
+    finally:
+        for pack in maps.values():
+            pack.close()
+
+
+def export_frames(frames: list[Frame], destination: Path) -> int:
+    """Write frames as loose JPEG files, returning how many were written."""
+    destination.mkdir(parents=True, exist_ok=True)
+    written = 0
+    for frame in frames:
+        if frame.duplicate:
+            continue
+        name = f"frame_{frame.timestamp.strftime(FRAME_TIMESTAMP_FORMAT)}.jpg"
+        (destination / name).write_bytes(read_frame(frame))
+        written += 1
+    return written
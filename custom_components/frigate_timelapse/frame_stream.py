@@ -0,0 +1,108 @@
+"""Push-based frame ingestion from a camera's MJPEG stream."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from homeassistant.core import HomeAssistant
+
+from .frigate_api import FrigateAPI
+
+_LOGGER = logging.getLogger(__name__)
+
+# Frames per second asked from Frigate, its lowest rate
+STREAM_FPS = 1
+
+# Age past which the last streamed frame is no longer used for a capture
+STREAM_MAX_AGE = 3.0  # seconds
+
+# Delay before reconnecting, doubled after every failure up to the maximum
+STREAM_RETRY_MIN = 1.0  # seconds
+STREAM_RETRY_MAX = 60.0  # seconds
+
+
+class FrameStream:
+    """Keep the latest frame of a camera from one long-lived connection.
+
+    Captures sample the stream at their own cadence instead of requesting a
+    snapshot each. While the stream is down, latest() returns None and the
+    caller falls back to polling.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        frigate_api: FrigateAPI,
+        camera: str,
+        height: int | None = None,
+        fps: int = STREAM_FPS,
+    ) -> None:
+        """Initialize the stream."""
+        self.hass = hass
+        self.frigate_api = frigate_api
+        self.camera = camera
+        self.height = height
+        self.fps = fps
+        self.frames = 0
+        self._frame: bytes | None = None
+        self._received = 0.0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        """Return True while the stream is being consumed."""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start consuming the stream in the background."""
+        if self.running:
+            return
+        self._task = self.hass.async_create_background_task(
+            self._run(), f"frigate_timelapse_stream_{self.camera}"
+        )
+
+    async def stop(self) -> None:
+        """Close the stream."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        self._frame = None
+
+    def latest(self, max_age: float = STREAM_MAX_AGE) -> bytes | None:
+        """Return the last received frame if it is recent enough."""
+        if self._frame is None or time.monotonic() - self._received > max_age:
+            return None
+        return self._frame
+
+    async def _run(self) -> None:
+        """Read frames, reconnecting with backoff when the stream drops."""
+        delay = STREAM_RETRY_MIN
+        while True:
+            try:
+                async for frame in self.frigate_api.iter_mjpeg(
+                    self.camera, self.fps, self.height
+                ):
+                    self._frame = frame
+                    self._received = time.monotonic()
+                    self.frames += 1
+                    delay = STREAM_RETRY_MIN
+                _LOGGER.debug("MJPEG stream of %s ended", self.camera)
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.warning(
+                    "MJPEG stream of %s failed, polling snapshots until it is "
+                    "back: %s",
+                    self.camera,
+                    err,
+                )
+            self._frame = None
+            await asyncio.sleep(delay)
+            delay = min(STREAM_RETRY_MAX, delay * 2)
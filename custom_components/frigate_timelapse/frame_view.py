@@ -0,0 +1,373 @@
+"""HTTP views letting the Lovelace card browse captured frames."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from collections import OrderedDict
+from collections.abc import Callable
+from functools import partial
+from http import HTTPStatus
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from aiohttp import web
+from PIL import Image, ImageOps
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .frame_catalog import Frame
+from .frame_store import read_frame
+
+if TYPE_CHECKING:
+    from .timelapse_manager import TimelapseManager
+
+_LOGGER = logging.getLogger(__name__)
+
+# Thumbnail widths served, requests are rounded up to one of them
+THUMBNAIL_WIDTHS = (160, 320, 640)
+THUMBNAIL_QUALITY = 70
+
+# Sprite sheets hold SPRITE_FRAMES tiles in rows of SPRITE_COLUMNS
+SPRITE_FRAMES = 100
+SPRITE_COLUMNS = 10
+SPRITE_TILE_WIDTH = 160
+
+# Memory held by the most recently used thumbnails and sprites
+THUMBNAIL_CACHE_BYTES = 32 * 1024 * 1024
+
+# Frames never change once captured, so clients may keep them for a day
+CACHE_CONTROL = "private, max-age=86400"
+
+
+def tile_size(resolution: str, width: int) -> tuple[int, int]:
+    """Return the size of a tile of the given width in the output aspect."""
+    output_width, _, output_height = resolution.partition("x")
+    height = round(width * int(output_height) / int(output_width))
+    return width, height + height % 2
+
+
+def _open_reduced(data: bytes, size: tuple[int, int]) -> Image.Image:
+    """Decode a JPEG at the smallest scale still covering size."""
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", size)
+        return image.convert("RGB")
+
+
+def _encode_jpeg(image: Image.Image) -> bytes:
+    """Return an image as JPEG bytes."""
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=THUMBNAIL_QUALITY)
+    return output.getvalue()
+
+
+def make_thumbnail(data: bytes, width: int) -> bytes:
+    """Return a JPEG frame scaled down to width, keeping its aspect."""
+    image = _open_reduced(data, (width, width))
+    if image.width > width:
+        height = round(image.height * width / image.width)
+        image = image.resize((width, height), Image.Resampling.BILINEAR)
+    return _encode_jpeg(image)
+
+
+def make_sprite(frames: list[Frame], size: tuple[int, int], columns: int) -> bytes:
+    """Return a sprite sheet of frames letterboxed into equal tiles.
+
+    Frames are read one at a time, and a frame that cannot be read leaves
+    its tile black.
+    """
+    rows = -(-len(frames) // columns)
+    sheet = Image.new("RGB", (size[0] * columns, size[1] * rows))
+    for index, frame in enumerate(frames):
+        try:
+            tile = ImageOps.pad(_open_reduced(read_frame(frame), size), size)
+        except OSError as err:
+            _LOGGER.debug("Could not read frame %s: %s", frame.path, err)
+            continue
+        row, column = divmod(index, columns)
+        sheet.paste(tile, (column * size[0], row * size[1]))
+    return _encode_jpeg(sheet)
+
+
+def _load_or_render(path: Path | None, render: Callable[[], bytes]) -> bytes:
+    """Return an image from the disk cache, rendering and saving it if absent."""
+    if path is not None:
+        try:
+            data = path.read_bytes()
+            # Retention prunes the least recently used images first
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            pass
+
+    data = render()
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.part")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+    return data
+
+
+class ThumbnailCache:
+    """Size-bounded in-memory LRU of rendered images over a disk cache.
+
+    Images are rendered in the executor on first request, and concurrent
+    requests for the same image share one render.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, max_bytes: int = THUMBNAIL_CACHE_BYTES
+    ) -> None:
+        """Initialize the cache."""
+        self.hass = hass
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._pending: dict[str, asyncio.Future] = {}
+
+    async def async_get(
+        self, key: str, path: Path | None, render: Callable[[], bytes]
+    ) -> bytes:
+        """Return the image for key, from memory, disk or a fresh render."""
+        if (data := self._entries.get(key)) is not None:
+            self._entries.move_to_end(key)
+            return data
+
+        if (pending := self._pending.get(key)) is not None:
+            return await asyncio.shield(pending)
+
+        future = self._pending[key] = self.hass.loop.create_future()
+        try:
+            data = await self.hass.async_add_executor_job(_load_or_render, path, render)
+        except Exception as err:
+            future.set_exception(err)
+            # Retrieve it so waiterless failures are not reported as unhandled
+            future.exception()
+            raise
+        finally:
+            self._pending.pop(key, None)
+
+        future.set_result(data)
+        self._put(key, data)
+        return data
+
+    def _put(self, key: str, data: bytes) -> None:
+        """Add an image, evicting the least recently used ones over budget."""
+        if len(data) > self.max_bytes:
+            return
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+
+class _FrameView(HomeAssistantView):
+    """Base view resolving the manager of a config entry."""
+
+    def __init__(self, hass: HomeAssistant, cache: ThumbnailCache) -> None:
+        """Initialize the view."""
+        self.hass = hass
+        self.cache = cache
+
+    def _manager(self, entry_id: str) -> TimelapseManager | None:
+        """Return the manager of an entry, if it is loaded."""
+        entry_data = self.hass.data.get(DOMAIN, {}).get(entry_id)
+        if not isinstance(entry_data, dict):
+            return None
+        return entry_data.get("timelapse_manager")
+
+    async def _image_response(
+        self,
+        request: web.Request,
+        etag: str,
+        key: str,
+        path: Path | None,
+        render: Callable[[], bytes],
+    ) -> web.Response:
+        """Serve a cached image, answering 304 when the client has it."""
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=HTTPStatus.NOT_MODIFIED, headers=headers)
+        data = await self.cache.async_get(key, path, render)
+        return web.Response(body=data, content_type="image/jpeg", headers=headers)
+
+
+class FrameListView(_FrameView):
+    """List the frames of a session and the layout of its sprite sheets."""
+
+    url = "/api/frigate_timelapse/{entry_id}/frames"
+    name = "api:frigate_timelapse:frames"
+
+    async def get(self, request: web.Request, entry_id: str) -> web.Response:
+        """Return the frame list of a session, by default the latest one."""
+        if (manager := self._manager(entry_id)) is None:
+            return self.json_message("Unknown entry", HTTPStatus.NOT_FOUND)
+
+        sessions = await self.hass.async_add_executor_job(
+            manager.catalog.get_sessions, manager.camera
+        )
+        session = request.query.get("session") or manager.current_session
+        if session is None and sessions:
+            session = sessions[-1]
+
+        rows = []
+        if session is not None:
+            rows = await self.hass.async_add_executor_job(
+                manager.catalog.get_frame_index, manager.camera, session
+            )
+
+        width, height = tile_size(manager.resolution, SPRITE_TILE_WIDTH)
+        data: dict[str, Any] = {
+            "camera": manager.camera,
+            "session": session,
+            "sessions": sessions,
+            "frames": [{"id": row[0], "timestamp": row[1]} for row in rows],
+            "sprite": {
+                "frames": SPRITE_FRAMES,
+                "columns": SPRITE_COLUMNS,
+                "width": width,
+                "height": height,
+            },
+        }
+        return self.json(data)
+
+
+class ThumbnailView(_FrameView):
+    """Serve a downscaled frame."""
+
+    url = "/api/frigate_timelapse/{entry_id}/thumbnails/{frame_id}"
+    name = "api:frigate_timelapse:thumbnail"
+
+    async def get(
+        self, request: web.Request, entry_id: str, frame_id: str
+    ) -> web.Response:
+        """Return a frame scaled to the requested width."""
+        if (manager := self._manager(entry_id)) is None:
+            return self.json_message("Unknown entry", HTTPStatus.NOT_FOUND)
+        # Retention may not move or delete the frame while it is rendered
+        async with manager.frame_lock.read():
+            return await self._thumbnail(request, manager, frame_id)
+
+    async def _thumbnail(
+        self, request: web.Request, manager: TimelapseManager, frame_id: str
+    ) -> web.Response:
+        """Return a frame of the manager's camera scaled to the requested width."""
+        try:
+            requested = int(request.query.get("width", THUMBNAIL_WIDTHS[0]))
+            frames = await self.hass.async_add_executor_job(
+                manager.catalog.get_frames_by_id, [int(frame_id)]
+            )
+        except ValueError:
+            return self.json_message("Invalid request", HTTPStatus.BAD_REQUEST)
+        # The catalog is shared, an entry only serves its own camera's frames
+        if not frames or frames[0].camera != manager.camera:
+            return self.json_message("Unknown frame", HTTPStatus.NOT_FOUND)
+
+        frame = frames[0]
+        width = next(
+            (width for width in THUMBNAIL_WIDTHS if width >= requested),
+            THUMBNAIL_WIDTHS[-1],
+        )
+        # Ids can be reused once the newest frame is deleted, timestamps not
+        name = f"{frame.frame_id}_{int(frame.timestamp.timestamp() * 1e6)}_{width}"
+        path = _cache_dir(manager, frame.session) / f"{name}.jpg"
+        return await self._image_response(
+            request,
+            f'"{name}"',
+            f"{manager.catalog.db_path}:{name}",
+            path,
+            lambda: make_thumbnail(read_frame(frame), width),
+        )
+
+
+class SpriteView(_FrameView):
+    """Serve a sprite sheet of consecutive frames for scrubbing."""
+
+    url = "/api/frigate_timelapse/{entry_id}/sprites/{session}/{index}"
+    name = "api:frigate_timelapse:sprite"
+
+    async def get(
+        self, request: web.Request, entry_id: str, session: str, index: str
+    ) -> web.Response:
+        """Return sprite sheet index of a session's frame list."""
+        if (manager := self._manager(entry_id)) is None:
+            return self.json_message("Unknown entry", HTTPStatus.NOT_FOUND)
+        try:
+            start = int(index) * SPRITE_FRAMES
+        except ValueError:
+            return self.json_message("Invalid request", HTTPStatus.BAD_REQUEST)
+        # Retention may not move or delete frames while they are rendered
+        async with manager.frame_lock.read():
+            return await self._sprite(request, manager, session, index, start)
+
+    async def _sprite(
+        self,
+        request: web.Request,
+        manager: TimelapseManager,
+        session: str,
+        index: str,
+        start: int,
+    ) -> web.Response:
+        """Return the sprite sheet of a session starting at frame start."""
+        rows = []
+        if start >= 0:
+            rows = await self.hass.async_add_executor_job(
+                partial(
+                    manager.catalog.get_frame_index,
+                    manager.camera,
+                    session,
+                    offset=start,
+                    limit=SPRITE_FRAMES,
+                )
+            )
+        if not rows:
+            return self.json_message("Unknown sprite", HTTPStatus.NOT_FOUND)
+
+        # The sheet changes whenever its frames do, e.g. after thinning
+        digest = hashlib.sha1(
+            ",".join(f"{row[0]}@{row[1]}" for row in rows).encode()
+        ).hexdigest()[:16]
+        name = f"sprite_{index}_{digest}"
+        # The last sheet still grows while capturing, keep it in memory only
+        path = None
+        if len(rows) == SPRITE_FRAMES:
+            path = _cache_dir(manager, session) / f"{name}.jpg"
+
+        frame_ids = [row[0] for row in rows]
+        size = tile_size(manager.resolution, SPRITE_TILE_WIDTH)
+
+        def render() -> bytes:
+            frames = [
+                frame
+                for frame in manager.catalog.get_frames_by_id(frame_ids)
+                if frame.camera == manager.camera
+            ]
+            return make_sprite(frames, size, SPRITE_COLUMNS)
+
+        return await self._image_response(
+            request,
+            f'"{digest}"',
+            f"{manager.catalog.db_path}:{session}:{name}",
+            path,
+            render,
+        )
+
+
+def _cache_dir(manager: TimelapseManager, session: str) -> Path:
+    """Return the disk cache directory of a session's rendered images."""
+    return Path(manager.output_path) / "thumbnails" / manager.camera / session
+
+
+def async_register_views(hass: HomeAssistant) -> ThumbnailCache:
+    """Register the frame browser views and return their shared cache."""
+    cache = ThumbnailCache(hass)
+    for view in (FrameListView, ThumbnailView, SpriteView):
+        hass.http.register_view(view(hass, cache))
+    return cache
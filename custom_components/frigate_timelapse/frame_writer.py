@@ -0,0 +1,107 @@
+"""Bounded writer streaming captured frames to disk."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO
+
+# Chunks buffered across all cameras before downloads have to wait
+MAX_PENDING_CHUNKS = 32
+
+
+class FrameWriter:
+    """Write frame files on one dedicated thread with bounded buffering.
+
+    Every camera shares the writer, so the memory held by chunks waiting
+    for the disk stays the same however many cameras are captured.
+    """
+
+    def __init__(self, max_pending_chunks: int = MAX_PENDING_CHUNKS) -> None:
+        """Initialize the writer."""
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="frigate_timelapse_writer"
+        )
+        self._slots = asyncio.Semaphore(max_pending_chunks)
+
+    def open(self, path: Path) -> FrameFile:
+        """Return a file that only appears at path once committed."""
+        return FrameFile(self, path)
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking call on the writer thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _submit(self, func: Callable[..., Any], *args: Any) -> asyncio.Future:
+        """Queue a blocking call, waiting while the buffer is full."""
+        await self._slots.acquire()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, func, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+
+class FrameFile:
+    """A frame being streamed to a temporary file.
+
+    The data is written next to the final path and renamed into place on
+    commit, so readers never see a partial frame.
+    """
+
+    def __init__(self, writer: FrameWriter, path: Path) -> None:
+        """Initialize the file."""
+        self.path = path
+        self.size = 0
+        self._writer = writer
+        self._part_path = path.with_name(f".{path.name}.part")
+        self._file: BinaryIO | None = None
+        self._last_write: asyncio.Future | None = None
+
+    async def write(self, chunk: bytes) -> None:
+        """Queue a chunk, waiting for the previous one of this file first."""
+        await self._wait_last_write()
+        self._last_write = await self._writer._submit(self._write, chunk)
+        self.size += len(chunk)
+
+    async def commit(self) -> int:
+        """Move the complete file into place, returning its size."""
+        await self._wait_last_write()
+        await self._writer._run(self._commit)
+        return self.size
+
+    async def abort(self) -> None:
+        """Discard the partial file."""
+        try:
+            await self._wait_last_write()
+        except OSError:
+            pass
+        await self._writer._run(self._abort)
+
+    async def _wait_last_write(self) -> None:
+        """Wait for the queued chunk, raising its write error if any."""
+        if self._last_write is not None:
+            last_write, self._last_write = self._last_write, None
+            await last_write
+
+    def _write(self, chunk: bytes) -> None:
+        """Write a chunk to the temporary file."""
+        if self._file is None:
+            self._file = open(self._part_path, "wb")
+        self._file.write(chunk)
+
+    def _commit(self) -> None:
+        """Close the temporary file and rename it atomically."""
+        if self._file is None:
+            self._file = open(self._part_path, "wb")
+        self._file.close()
+        os.replace(self._part_path, self.path)
+
+    def _abort(self) -> None:
+        """Close and remove the temporary file."""
+        if self._file is not None:
+            self._file.close()
+        self._part_path.unlink(missing_ok=True)
@@ -4,12 +4,39 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
 from typing import Any
 
 import aiohttp
 
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_FRIGATE_CLIENTS, DOMAIN
+
 _LOGGER = logging.getLogger(__name__)
 
+# Connection pool tuning for the shared client
+CONNECTION_LIMIT_PER_HOST = 8
+KEEPALIVE_TIMEOUT = 60  # seconds
+DNS_CACHE_TTL = 300  # seconds
+
+# Upper bound for establishing a connection when a timeout is requested
+CONNECT_TIMEOUT = 5  # seconds
+
+# How long a downloaded /api/config is served without asking Frigate again
+CONFIG_CACHE_TTL = 60  # seconds
+
+# Size of the pieces a streamed snapshot is read in
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Longest silence tolerated on an MJPEG stream before reconnecting
+MJPEG_READ_TIMEOUT = 30  # seconds
+
+# Events requested per /api/events call and how long the call may take
+EVENTS_LIMIT = 100
+EVENTS_TIMEOUT = 10  # seconds
+
 
 class FrigateAPI:
     """Class to interact with Frigate API."""
@@ -18,11 +45,23 @@ class FrigateAPI:
         """Initialize Frigate API client."""
         self.base_url = base_url.rstrip("/")
         self._session: aiohttp.ClientSession | None = None
+        self._users = 0
+
+        self._config: dict[str, Any] | None = None
+        self._config_fetched = 0.0
+        self._config_etag: str | None = None
+        self._config_last_modified: str | None = None
+        self._config_lock = asyncio.Lock()
 
     async def _get_session(self) -> aiohttp.ClientSession:
         """Get or create aiohttp session."""
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
+            connector = aiohttp.TCPConnector(
+                limit_per_host=CONNECTION_LIMIT_PER_HOST,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=DNS_CACHE_TTL,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
         return self._session
 
     async def close(self) -> None:
@@ -30,19 +69,65 @@ class FrigateAPI:
         if self._session and not self._session.closed:
             await self._session.close()
 
+    def _config_is_fresh(self) -> bool:
+        """Return True if the cached config is within its TTL."""
+        return (
+            self._config is not None
+            and time.monotonic() - self._config_fetched < CONFIG_CACHE_TTL
+        )
+
+    async def get_config(self, force_refresh: bool = False) -> dict[str, Any]:
+        """Get Frigate's configuration, cached for CONFIG_CACHE_TTL seconds.
+
+        Concurrent callers share a single request, and an expired cache is
+        revalidated with ETag/Last-Modified when the server provides them.
+        """
+        if not force_refresh and self._config_is_fresh():
+            return self._config
+
+        async with self._config_lock:
+            # Another caller may have refreshed it while we waited
+            if not force_refresh and self._config_is_fresh():
+                return self._config
+
+            headers = {}
+            if self._config is not None:
+                if self._config_etag:
+                    headers["If-None-Match"] = self._config_etag
+                if self._config_last_modified:
+                    headers["If-Modified-Since"] = self._config_last_modified
+
+            session = await self._get_session()
+            async with session.get(
+                f"{self.base_url}/api/config", headers=headers
+            ) as response:
+                if response.status == 304 and self._config is not None:
+                    _LOGGER.debug("Frigate config not modified")
+                elif response.status == 200:
+                    self._config = await response.json()
+                    self._config_etag = response.headers.get("ETag")
+                    self._config_last_modified = response.headers.get("Last-Modified")
+                else:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info,
+                        response.history,
+                        status=response.status,
+                        message="Failed to get Frigate config",
+                    )
+
+            self._config_fetched = time.monotonic()
+            return self._config
+
     async def get_cameras(self) -> list[str]:
         """Get list of available cameras from Frigate."""
         try:
-            session = await self._get_session()
-            async with session.get(f"{self.base_url}/api/config") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    cameras = list(data.get("cameras", {}).keys())
-                    _LOGGER.debug("Found cameras: %s", cameras)
-                    return cameras
-                else:
-                    _LOGGER.error("Failed to get cameras: %s", response.status)
-                    return []
+            data = await self.get_config()
+            cameras = list(data.get("cameras", {}).keys())
+            _LOGGER.debug("Found cameras: %s", cameras)
+            return cameras
+        except aiohttp.ClientResponseError as err:
+            _LOGGER.error("Failed to get cameras: %s", err.status)
+            return []
         except Exception as err:
             _LOGGER.error("Error getting cameras from Frigate: %s", err)
             return []
@@ -50,24 +135,70 @@ class FrigateAPI:
     async def get_camera_config(self, camera: str) -> dict[str, Any] | None:
         """Get configuration for a specific camera."""
         try:
-            session = await self._get_session()
-            async with session.get(f"{self.base_url}/api/config") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data.get("cameras", {}).get(camera)
-                return None
+            data = await self.get_config()
+            return data.get("cameras", {}).get(camera)
+        except aiohttp.ClientResponseError:
+            return None
         except Exception as err:
             _LOGGER.error("Error getting camera config: %s", err)
             return None
 
-    async def get_latest_image(self, camera: str) -> bytes | None:
-        """Get latest snapshot from camera."""
+    async def get_events(
+        self,
+        camera: str | None = None,
+        in_progress: bool = False,
+        after: float | None = None,
+        limit: int = EVENTS_LIMIT,
+    ) -> list[dict[str, Any]] | None:
+        """Get detection events, newest first, or None if the request failed.
+
+        in_progress restricts the list to events that have not ended yet.
+        """
+        params: dict[str, Any] = {"limit": limit}
+        if camera:
+            params["cameras"] = camera
+        if in_progress:
+            params["in_progress"] = 1
+        if after is not None:
+            params["after"] = after
+        try:
+            session = await self._get_session()
+            async with session.get(
+                f"{self.base_url}/api/events",
+                params=params,
+                timeout=aiohttp.ClientTimeout(total=EVENTS_TIMEOUT),
+            ) as response:
+                if response.status != 200:
+                    _LOGGER.error("Failed to get events: %s", response.status)
+                    return None
+                return await response.json()
+        except asyncio.TimeoutError:
+            _LOGGER.warning("Timed out getting events from Frigate")
+            return None
+        except Exception as err:
+            _LOGGER.error("Error getting events from Frigate: %s", err)
+            return None
+
+    async def get_latest_image(
+        self,
+        camera: str,
+        timeout: float | None = None,
+        height: int | None = None,
+        quality: int | None = None,
+    ) -> bytes | None:
+        """Get latest snapshot from camera.
+
+        If timeout is given the whole request must complete within it.
+        Height and quality let Frigate downscale and compress the snapshot
+        before sending it.
+        """
         try:
             session = await self._get_session()
             url = f"{self.base_url}/api/{camera}/latest.jpg"
             _LOGGER.debug("Fetching image from: %s", url)
 
-            async with session.get(url) as response:
+            kwargs = self._snapshot_kwargs(timeout, height, quality)
+            async with session.get(url, **kwargs) as response:
                 if response.status == 200:
                     image_data = await response.read()
                     _LOGGER.debug(
@@ -77,10 +208,103 @@ class FrigateAPI:
                 else:
                     _LOGGER.error("Failed to get image: %s", response.status)
                     return None
+        except asyncio.TimeoutError:
+            _LOGGER.warning(
+                "Timed out after %ss getting latest image from %s", timeout, camera
+            )
+            return None
         except Exception as err:
             _LOGGER.error("Error getting latest image from %s: %s", camera, err)
             return None
 
+    async def stream_latest_image(
+        self,
+        camera: str,
+        write: Callable[[bytes], Awaitable[None]],
+        timeout: float | None = None,
+        height: int | None = None,
+        quality: int | None = None,
+    ) -> int | None:
+        """Stream the latest snapshot of a camera in chunks.
+
+        Each chunk is awaited through write as it arrives, so the snapshot is
+        never held in memory as a whole. Returns the number of bytes written,
+        or None if the request failed.
+        """
+        try:
+            session = await self._get_session()
+            url = f"{self.base_url}/api/{camera}/latest.jpg"
+            _LOGGER.debug("Streaming image from: %s", url)
+
+            kwargs = self._snapshot_kwargs(timeout, height, quality)
+            async with session.get(url, **kwargs) as response:
+                if response.status != 200:
+                    _LOGGER.error("Failed to get image: %s", response.status)
+                    return None
+
+                size = 0
+                async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    await write(chunk)
+                    size += len(chunk)
+                _LOGGER.debug("Successfully streamed image (%d bytes)", size)
+                return size
+        except asyncio.TimeoutError:
+            _LOGGER.warning(
+                "Timed out after %ss streaming latest image from %s", timeout, camera
+            )
+            return None
+        except Exception as err:
+            _LOGGER.error("Error streaming latest image from %s: %s", camera, err)
+            return None
+
+    async def iter_mjpeg(
+        self, camera: str, fps: int, height: int | None = None
+    ) -> AsyncIterator[bytes]:
+        """Yield the JPEG frames of a camera's MJPEG stream as they arrive.
+
+        Frigate encodes the stream once for every viewer, so frames come over
+        one long-lived connection instead of a request each. Raises on
+        connection errors and returns when the server ends the stream.
+        """
+        session = await self._get_session()
+        url = f"{self.base_url}/api/{camera}"
+        params: dict[str, Any] = {"fps": fps}
+        if height:
+            params["h"] = height
+        timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=CONNECT_TIMEOUT, sock_read=MJPEG_READ_TIMEOUT
+        )
+        _LOGGER.debug("Opening MJPEG stream: %s %s", url, params)
+
+        async with session.get(url, params=params, timeout=timeout) as response:
+            if response.status != 200:
+                raise aiohttp.ClientResponseError(
+                    response.request_info,
+                    response.history,
+                    status=response.status,
+                    message="Failed to open MJPEG stream",
+                )
+            reader = aiohttp.MultipartReader.from_response(response)
+            while (part := await reader.next()) is not None:
+                if isinstance(part, aiohttp.BodyPartReader):
+                    yield await part.read()
+
+    @staticmethod
+    def _snapshot_kwargs(
+        timeout: float | None, height: int | None, quality: int | None
+    ) -> dict[str, Any]:
+        """Return request arguments for a latest.jpg request."""
+        kwargs: dict[str, Any] = {"params": {}}
+        if height:
+            kwargs["params"]["h"] = height
+        if quality:
+            kwargs["params"]["quality"] = quality
+        if timeout:
+            kwargs["timeout"] = aiohttp.ClientTimeout(
+                total=timeout, sock_connect=min(CONNECT_TIMEOUT, timeout)
+            )
+        return kwargs
+
     async def test_connection(self) -> bool:
         """Test connection to Frigate."""
         try:
@@ -88,3 +312,28 @@ class FrigateAPI:
             return len(cameras) > 0
         except Exception:
             return False
+
+
+def async_get_frigate_api(hass: HomeAssistant, base_url: str) -> FrigateAPI:
+    """Return the shared client for a Frigate server, creating it if needed.
+
+    Every call must be balanced with async_release_frigate_api.
+    """
+    clients: dict[str, FrigateAPI] = hass.data.setdefault(DOMAIN, {}).setdefault(
+        DATA_FRIGATE_CLIENTS, {}
+    )
+    key = base_url.rstrip("/")
+    if (client := clients.get(key)) is None:
+        client = clients[key] = FrigateAPI(key)
+    client._users += 1
+    return client
+
+
+async def async_release_frigate_api(hass: HomeAssistant, client: FrigateAPI) -> None:
+    """Release a shared client, closing it when its last user is gone."""
+    client._users -= 1
+    if client._users > 0:
+        return
+
+    hass.data[DOMAIN][DATA_FRIGATE_CLIENTS].pop(client.base_url, None)
+    await client.close()
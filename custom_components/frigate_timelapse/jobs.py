@@ -0,0 +1,164 @@
+"""Timelapse encode jobs."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+# Minimum seconds between progress notifications
+PROGRESS_INTERVAL = 1.0
+
+
+@dataclass
+class EncodeJob:
+    """A timelapse generation request and its progress."""
+
+    camera: str
+    output_path: Path
+    total_frames: int = 0
+    # Every file the job writes, output_path being the first
+    outputs: list[Path] = field(default_factory=list)
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: str = JOB_QUEUED
+    frames_done: int = 0
+    error: str | None = None
+    started: float | None = None
+    finished: float | None = None
+    task: asyncio.Task | None = field(default=None, repr=False)
+    on_update: Callable[[], None] | None = field(default=None, repr=False)
+    _last_update: float = field(default=0.0, repr=False)
+
+    @property
+    def active(self) -> bool:
+        """Return True while the job is queued or running."""
+        return self.status in (JOB_QUEUED, JOB_RUNNING)
+
+    @property
+    def progress(self) -> float:
+        """Return percent complete."""
+        if self.status == JOB_DONE:
+            return 100.0
+        if not self.total_frames:
+            return 0.0
+        return round(min(100.0, 100 * self.frames_done / self.total_frames), 1)
+
+    @property
+    def speed(self) -> float:
+        """Return encoded frames per second."""
+        if self.started is None:
+            return 0.0
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return round(self.frames_done / elapsed, 1) if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> int | None:
+        """Return estimated seconds until completion."""
+        if self.status != JOB_RUNNING or not self.speed:
+            return None
+        return max(0, int((self.total_frames - self.frames_done) / self.speed))
+
+    def start(self) -> None:
+        """Mark the job as running."""
+        self.status = JOB_RUNNING
+        self.started = time.monotonic()
+        self._notify()
+
+    def add_frames(self, count: int) -> None:
+        """Account for newly encoded frames."""
+        self.frames_done += count
+        now = time.monotonic()
+        if now - self._last_update >= PROGRESS_INTERVAL:
+            self._last_update = now
+            self._notify()
+
+    def finish(self, status: str, error: str | None = None) -> None:
+        """Mark the job as finished."""
+        self.status = status
+        self.error = error
+        self.finished = time.monotonic()
+        self._notify()
+
+    def cancel(self) -> bool:
+        """Cancel the job if it is still running."""
+        if self.task is None or self.task.done():
+            return False
+        return self.task.cancel()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a serializable summary of the job."""
+        return {
+            "job_id": self.job_id,
+            "camera": self.camera,
+            "status": self.status,
+            "output_file": str(self.output_path),
+            "output_files": [str(path) for path in self.outputs or [self.output_path]],
+            "total_frames": self.total_frames,
+            "frames_done": self.frames_done,
+            "progress": self.progress,
+            "encode_fps": self.speed,
+            "eta": self.eta,
+            "error": self.error,
+        }
+
+    def _notify(self) -> None:
+        """Call the update callback."""
+        if self.on_update is not None:
+            self.on_update()
+
+
+class JobGroup:
+    """Jobs sharing one deduplicated encode, updated together.
+
+    Jobs joining after the encode started catch up on its progress, and
+    jobs that are cancelled or detached receive no further updates.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty group."""
+        self.jobs: list[EncodeJob] = []
+        self.started = False
+        self.frames_done = 0
+
+    def attach(self, job: EncodeJob) -> None:
+        """Add a job waiting for the shared encode."""
+        self.jobs.append(job)
+        if self.started:
+            job.start()
+            job.add_frames(self.frames_done)
+
+    def detach(self, job: EncodeJob) -> None:
+        """Remove a job that stopped waiting."""
+        if job in self.jobs:
+            self.jobs.remove(job)
+
+    def start(self) -> None:
+        """Mark every waiting job as running."""
+        self.started = True
+        self.frames_done = 0
+        for job in self._live():
+            job.start()
+
+    def add_frames(self, count: int) -> None:
+        """Account for newly encoded frames on every waiting job."""
+        self.frames_done += count
+        for job in self._live():
+            job.add_frames(count)
+
+    def _live(self) -> list[EncodeJob]:
+        """Return the jobs still waiting for the encode."""
+        return [
+            job
+            for job in self.jobs
+            if job.active and not (job.task is not None and job.task.cancelled())
+        ]
@@ -0,0 +1,378 @@
+"""Quota-driven retention with progressive thinning of old frames."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.helpers.event import async_track_time_interval
+
+from .frame_catalog import Frame, FrameCatalog, session_dir
+from .frame_store import PACK_GLOB, RECORD_HEADER, compact_pack
+
+if TYPE_CHECKING:
+    from .timelapse_manager import TimelapseManager
+
+_LOGGER = logging.getLogger(__name__)
+
+# Past each age, frames closer together than the spacing are removed. The
+# spacing is either a number of capture intervals or a fixed duration.
+THINNING_TIERS: tuple[tuple[timedelta, int | timedelta], ...] = (
+    (timedelta(days=1), 10),  # one frame in ten
+    (timedelta(days=7), timedelta(hours=1)),  # one frame per hour
+)
+
+RETENTION_INTERVAL = timedelta(minutes=15)
+
+# Frames handled per executor job, and the pause between jobs
+RETENTION_BATCH_SIZE = 500
+RETENTION_BATCH_DELAY = 0.5  # seconds
+
+# Packs whose live data falls below this share of their size are rewritten
+PACK_COMPACT_RATIO = 0.5
+
+MEGABYTE = 1024 * 1024
+
+# Disk held by each camera's rendered thumbnails and sprite sheets
+THUMBNAIL_DISK_BYTES = 256 * MEGABYTE
+
+
+def _active_pack(output_path: Path, camera: str, session: str | None) -> Path | None:
+    """Return the pack the current session is appending to, if any."""
+    if session is None:
+        return None
+    packs = sorted(session_dir(output_path, camera, session).glob(PACK_GLOB))
+    return packs[-1] if packs else None
+
+
+def _reclaim_pack(catalog: FrameCatalog, pack_path: Path) -> int:
+    """Delete or compact a pack that lost records, returning bytes freed."""
+    try:
+        file_size = pack_path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+    records = catalog.get_pack_records(pack_path)
+    if not records:
+        pack_path.unlink()
+        return file_size
+
+    live = sum(RECORD_HEADER.size + length for _, _, length in records)
+    if live >= file_size * PACK_COMPACT_RATIO:
+        return 0
+
+    catalog.move_records(pack_path, compact_pack(pack_path, records))
+    return file_size - live
+
+
+def discard_frames(
+    catalog: FrameCatalog, frames: list[Frame], active_pack: Path | None
+) -> int:
+    """Forget frames and delete data nothing refers to, returning bytes freed."""
+    freed = 0
+    packs = set()
+    for frame in catalog.delete_frames(frames):
+        if frame.offset is not None:
+            packs.add(frame.path)
+            continue
+        try:
+            frame.path.unlink()
+        except FileNotFoundError:
+            continue
+        freed += frame.size
+
+    for pack_path in packs - {active_pack}:
+        freed += _reclaim_pack(catalog, pack_path)
+    return freed
+
+
+def thin_batch(
+    catalog: FrameCatalog,
+    camera: str,
+    capture_interval: float,
+    output_path: Path,
+    current_session: str | None,
+    now: datetime,
+) -> int:
+    """Thin the oldest batch of frames due for a tier, returning its size."""
+    active_pack = _active_pack(output_path, camera, current_session)
+    for tier, (age, spacing) in enumerate(THINNING_TIERS, start=1):
+        frames = catalog.get_thinning_candidates(
+            camera, tier, now - age, RETENTION_BATCH_SIZE
+        )
+        if not frames:
+            continue
+
+        if isinstance(spacing, timedelta):
+            min_gap = spacing.total_seconds()
+        else:
+            min_gap = spacing * capture_interval
+        # Tolerate capture jitter so the pattern does not slip by a frame
+        min_gap -= capture_interval / 2
+
+        last_kept = catalog.get_last_kept(camera, tier, frames[0].timestamp)
+        kept, dropped = [], []
+        for frame in frames:
+            if (
+                last_kept is None
+                or (frame.timestamp - last_kept).total_seconds() >= min_gap
+            ):
+                kept.append(frame)
+                last_kept = frame.timestamp
+            else:
+                dropped.append(frame)
+
+        catalog.set_tier([frame.frame_id for frame in kept], tier)
+        discard_frames(catalog, dropped, active_pack)
+        return len(frames)
+    return 0
+
+
+def oldest_frame(
+    catalog: FrameCatalog,
+    camera: str,
+    output_path: Path,
+    current_session: str | None,
+) -> datetime | None:
+    """Return the capture time of the oldest frame that may be deleted."""
+    frames = catalog.get_oldest_frames(
+        camera, 1, _active_pack(output_path, camera, current_session)
+    )
+    return frames[0].timestamp if frames else None
+
+
+def trim_batch(
+    catalog: FrameCatalog,
+    camera: str,
+    output_path: Path,
+    current_session: str | None,
+) -> int | None:
+    """Delete the oldest batch of frames, returning bytes freed.
+
+    Frames in the pack still being appended to are left alone. Returns None
+    once there is nothing left that may be deleted.
+    """
+    active_pack = _active_pack(output_path, camera, current_session)
+    frames = catalog.get_oldest_frames(camera, RETENTION_BATCH_SIZE, active_pack)
+    if not frames:
+        return None
+
+    freed = discard_frames(catalog, frames, active_pack)
+
+    # Segments only covering deleted frames go with them
+    for segment_path in catalog.delete_segments_before(camera, frames[-1].timestamp):
+        try:
+            freed += segment_path.stat().st_size
+            segment_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    for session in {frame.session for frame in frames} - {current_session}:
+        if catalog.count_frames(camera, session):
+            continue
+        for path in (
+            session_dir(output_path, camera, session),
+            output_path / "segments" / camera / session,
+            output_path / "thumbnails" / camera / session,
+        ):
+            shutil.rmtree(path, ignore_errors=True)
+        catalog.delete_session(camera, session)
+        _LOGGER.info("Removed emptied session %s of %s", session, camera)
+
+    return freed
+
+
+def disk_usage(catalog: FrameCatalog, camera: str) -> int:
+    """Return the bytes of frames, packs and segments held for a camera."""
+    usage = catalog.get_loose_size(camera)
+    for path in catalog.get_files(camera):
+        try:
+            usage += path.stat().st_size
+        except FileNotFoundError:
+            continue
+    return usage
+
+
+def prune_thumbnails(
+    output_path: Path, camera: str, max_bytes: int = THUMBNAIL_DISK_BYTES
+) -> int:
+    """Delete a camera's least recently used rendered images over the budget.
+
+    Returns the bytes freed. Images still being written are left alone.
+    """
+    images = []
+    for path in (output_path / "thumbnails" / camera).rglob("*.jpg"):
+        if path.name.startswith("."):
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        images.append((stat.st_mtime, stat.st_size, path))
+
+    excess = sum(size for _, size, _ in images) - max_bytes
+    freed = 0
+    for _, size, path in sorted(images):
+        if freed >= excess:
+            break
+        path.unlink(missing_ok=True)
+        freed += size
+    return freed
+
+
+class RetentionEngine:
+    """Thin out old frames and enforce disk quotas for every camera.
+
+    Work is done in small executor batches separated by short pauses, so a
+    large backlog never monopolizes the executor or the disk.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the engine."""
+        self.hass = hass
+        self._managers: dict[int, TimelapseManager] = {}
+        self._ids = itertools.count()
+        self._unsub_timer: CALLBACK_TYPE | None = None
+        self._task: asyncio.Task | None = None
+
+    def register(self, manager: TimelapseManager) -> CALLBACK_TYPE:
+        """Start managing a camera's frames, returning an unregister callback."""
+        manager_id = next(self._ids)
+        self._managers[manager_id] = manager
+        if self._unsub_timer is None:
+            self._unsub_timer = async_track_time_interval(
+                self.hass, self._async_tick, RETENTION_INTERVAL
+            )
+
+        def unregister() -> None:
+            self._managers.pop(manager_id, None)
+            if not self._managers and self._unsub_timer is not None:
+                self._unsub_timer()
+                self._unsub_timer = None
+                if self._task is not None:
+                    self._task.cancel()
+
+        return unregister
+
+    @property
+    def global_quota(self) -> int:
+        """Return the quota shared by all cameras in bytes, 0 if unlimited."""
+        quotas = [
+            m.global_quota_mb for m in self._managers.values() if m.global_quota_mb
+        ]
+        return min(quotas) * MEGABYTE if quotas else 0
+
+    async def _async_tick(self, _now: datetime) -> None:
+        """Start a retention pass unless one is still running."""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = self.hass.async_create_task(self.async_run())
+
+    async def async_run(self) -> None:
+        """Run one retention pass over every camera."""
+        try:
+            managers = list(self._managers.values())
+            for manager in managers:
+                if manager.thinning:
+                    await self._thin(manager)
+
+            # Rendered images are a cache, bounded apart from the quotas
+            for manager in managers:
+                await self.hass.async_add_executor_job(
+                    prune_thumbnails, Path(manager.output_path), manager.camera
+                )
+
+            usage = {}
+            for manager in managers:
+                usage[manager] = await self.hass.async_add_executor_job(
+                    disk_usage, manager.catalog, manager.camera
+                )
+                if manager.quota_mb:
+                    usage[manager] = await self._trim(
+                        manager, usage[manager], manager.quota_mb * MEGABYTE
+                    )
+
+            if self.global_quota:
+                await self._trim_global(usage, self.global_quota)
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error("Error applying retention: %s", err)
+
+    async def _thin(self, manager: TimelapseManager) -> None:
+        """Thin a camera's frames batch by batch until nothing is due."""
+        while True:
+            # Frames being read by a capture, encode or view stay put
+            async with manager.frame_lock.write() as acquired:
+                if not acquired:
+                    return
+                done = await self.hass.async_add_executor_job(
+                    thin_batch,
+                    manager.catalog,
+                    manager.camera,
+                    manager.capture_interval,
+                    Path(manager.output_path),
+                    manager.current_session,
+                    datetime.now(),
+                )
+            if not done:
+                return
+            await asyncio.sleep(RETENTION_BATCH_DELAY)
+
+    async def _trim(self, manager: TimelapseManager, usage: int, quota: int) -> int:
+        """Delete a camera's oldest frames until it fits its quota."""
+        while usage > quota:
+            freed = await self._trim_batch(manager)
+            if freed is None:
+                break
+            usage -= freed
+            await asyncio.sleep(RETENTION_BATCH_DELAY)
+        return usage
+
+    async def _trim_global(
+        self, usage: dict[TimelapseManager, int], quota: int
+    ) -> None:
+        """Delete the oldest frames across cameras until all fit the quota."""
+        candidates = set(usage)
+        while sum(usage.values()) > quota and candidates:
+            oldest: dict[TimelapseManager, datetime] = {}
+            for manager in candidates:
+                timestamp = await self.hass.async_add_executor_job(
+                    oldest_frame,
+                    manager.catalog,
+                    manager.camera,
+                    Path(manager.output_path),
+                    manager.current_session,
+                )
+                if timestamp is not None:
+                    oldest[manager] = timestamp
+            if not oldest:
+                break
+
+            manager = min(oldest, key=oldest.__getitem__)
+            freed = await self._trim_batch(manager)
+            if freed is None:
+                candidates.discard(manager)
+                continue
+            usage[manager] -= freed
+            await asyncio.sleep(RETENTION_BATCH_DELAY)
+
+    async def _trim_batch(self, manager: TimelapseManager) -> int | None:
+        """Delete a batch of a camera's oldest frames.
+
+        Returns None if nothing may be deleted or the frames are being read.
+        """
+        async with manager.frame_lock.write() as acquired:
+            if not acquired:
+                return None
+            return await self.hass.async_add_executor_job(
+                trim_batch,
+                manager.catalog,
+                manager.camera,
+                Path(manager.output_path),
+                manager.current_session,
+            )
@@ -0,0 +1,195 @@
+"""Global encode scheduler shared by every config entry."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+PRIORITY_MANUAL = 0
+PRIORITY_BATCH = 10
+
+# Local (start, end) hours an encode may start in, end excluded; wraps
+# around midnight when start is after end
+OffPeakWindow = tuple[int, int]
+
+
+def in_window(window: OffPeakWindow, now: datetime) -> bool:
+    """Return True if now falls inside the window."""
+    start, end = window
+    if start <= end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
+
+
+def until_window(window: OffPeakWindow, now: datetime) -> float:
+    """Return the seconds until the window next opens."""
+    opens = now.replace(hour=window[0], minute=0, second=0, microsecond=0)
+    if opens <= now:
+        opens += timedelta(days=1)
+    return (opens - now).total_seconds()
+
+
+@dataclass(order=True)
+class _Request:
+    """A queued encode request."""
+
+    priority: int
+    sequence: int
+    key: str = field(compare=False)
+    factory: Callable[[int], Awaitable[Any]] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    waiters: int = field(default=1, compare=False)
+    task: asyncio.Task | None = field(default=None, compare=False)
+    window: OffPeakWindow | None = field(default=None, compare=False)
+
+
+class EncodeScheduler:
+    """Queue encodes from all managers and run a CPU-bounded number at once.
+
+    Requests with the same key are deduplicated: later callers wait for the
+    request already queued or running and share its result. Requests given
+    an off-peak window wait in the queue until it opens.
+
+    Live encoders are not counted against max_concurrent: they run for a
+    whole session and only encode a frame per capture. They are capped to
+    the same threads as a scheduled encode.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        max_concurrent: int | None = None,
+        threads: int | None = None,
+    ) -> None:
+        """Initialize the scheduler."""
+        # Leave a core for Home Assistant and Frigate
+        usable = max(1, (os.cpu_count() or 1) - 1)
+        self.hass = hass
+        self.max_concurrent = max_concurrent or max(1, usable // 2)
+        self.threads = threads or max(1, usable // self.max_concurrent)
+
+        self._queue: list[_Request] = []
+        self._requests: dict[str, _Request] = {}
+        self._running = 0
+        self._sequence = itertools.count()
+        self._wakeup: asyncio.TimerHandle | None = None
+
+    @property
+    def queued(self) -> int:
+        """Return the number of requests waiting for a slot."""
+        return len(self._queue)
+
+    @property
+    def running(self) -> int:
+        """Return the number of encodes currently running."""
+        return self._running
+
+    async def submit(
+        self,
+        key: str,
+        factory: Callable[[int], Awaitable[Any]],
+        priority: int = PRIORITY_BATCH,
+        window: OffPeakWindow | None = None,
+    ) -> Any:
+        """Run an encode when a slot is free and return its result.
+
+        The factory receives the number of encoder threads it may use.
+        """
+        request = self._requests.get(key)
+        if request is not None:
+            request.waiters += 1
+            if priority < request.priority and request.task is None:
+                # Promote a queued request to the caller's priority
+                request.priority = priority
+                request.window = window
+                heapq.heapify(self._queue)
+                self._dispatch()
+            _LOGGER.debug("Joining queued encode %s", key)
+        else:
+            request = _Request(
+                priority=priority,
+                sequence=next(self._sequence),
+                key=key,
+                factory=factory,
+                future=self.hass.loop.create_future(),
+                window=window,
+            )
+            self._requests[key] = request
+            heapq.heappush(self._queue, request)
+            self._dispatch()
+
+        try:
+            return await asyncio.shield(request.future)
+        except asyncio.CancelledError:
+            request.waiters -= 1
+            if request.waiters == 0:
+                self._cancel(request)
+            raise
+
+    def _cancel(self, request: _Request) -> None:
+        """Drop a request nobody waits for anymore."""
+        if request.task is not None:
+            request.task.cancel()
+            return
+
+        self._queue.remove(request)
+        heapq.heapify(self._queue)
+        self._requests.pop(request.key, None)
+        request.future.cancel()
+
+    def _dispatch(self) -> None:
+        """Start queued requests while slots are free."""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+
+        now = datetime.now()
+        deferred: list[_Request] = []
+        while self._queue and self._running < self.max_concurrent:
+            request = heapq.heappop(self._queue)
+            if request.window is not None and not in_window(request.window, now):
+                deferred.append(request)
+                continue
+            self._running += 1
+            request.task = self.hass.async_create_task(self._run(request))
+
+        for request in deferred:
+            heapq.heappush(self._queue, request)
+        if deferred:
+            delay = min(until_window(request.window, now) for request in deferred)
+            _LOGGER.debug(
+                "Deferring %d encodes to off-peak hours for %ds", len(deferred), delay
+            )
+            self._wakeup = self.hass.loop.call_later(delay, self._dispatch)
+
+    async def _run(self, request: _Request) -> None:
+        """Run a request and publish its result."""
+        _LOGGER.debug(
+            "Starting encode %s (%d running, %d queued)",
+            request.key,
+            self._running,
+            len(self._queue),
+        )
+        try:
+            result = await request.factory(self.threads)
+        except asyncio.CancelledError:
+            request.future.cancel()
+        except Exception as err:  # pylint: disable=broad-except
+            request.future.set_exception(err)
+        else:
+            request.future.set_result(result)
+        finally:
+            self._running -= 1
+            self._requests.pop(request.key, None)
+            self._dispatch()
@@ -8,6 +8,7 @@ from datetime import datetime
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import DOMAIN
@@ -28,6 +29,7 @@ async def async_setup_entry(
         TimelapseStatusSensor(timelapse_manager, camera, config_entry.entry_id),
         TimelapseImageCountSensor(timelapse_manager, camera, config_entry.entry_id),
         TimelapseLastCaptureSensor(timelapse_manager, camera, config_entry.entry_id),
+        TimelapseCaptureLagSensor(timelapse_manager, camera, config_entry.entry_id),
     ]
 
     async_add_entities(sensors)
@@ -66,12 +68,19 @@ class TimelapseStatusSensor(TimelapseBaseSensor):
     @property
     def extra_state_attributes(self) -> dict:
         """Return additional attributes."""
+        job = self._manager.active_job
         return {
             "camera": self._camera,
             "capture_interval": self._manager.capture_interval,
             "fps": self._manager.fps,
             "resolution": self._manager.resolution,
             "output_path": self._manager.output_path,
+            "live_encode": self._manager.live_encode,
+            "timelapse_path": self._manager.last_timelapse,
+            "job_id": job.job_id if job else None,
+            "progress": job.progress if job else None,
+            "encode_fps": job.speed if job else None,
+            "eta": job.eta if job else None,
         }
 
 
@@ -107,3 +116,26 @@ class TimelapseLastCaptureSensor(TimelapseBaseSensor):
     def native_value(self) -> datetime | None:
         """Return the state of the sensor."""
         return self._manager.last_capture
+
+
+class TimelapseCaptureLagSensor(TimelapseBaseSensor):
+    """Sensor for delay between scheduled and actual captures."""
+
+    def __init__(self, manager, camera: str, entry_id: str) -> None:
+        """Initialize the sensor."""
+        super().__init__(manager, camera, entry_id)
+        self._attr_name = "Capture Lag"
+        self._attr_unique_id = f"{entry_id}_capture_lag"
+        self._attr_icon = "mdi:timer-sand"
+        self._attr_native_unit_of_measurement = "s"
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the state of the sensor."""
+        return self._manager.capture_lag
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return additional attributes."""
+        return self._manager.capture_stats
@@ -4,20 +4,82 @@ from __future__ import annotations
 
 import asyncio
 import logging
-import os
-import subprocess
+import shutil
+from dataclasses import replace
 from datetime import datetime, timedelta
+from functools import partial
 from pathlib import Path
 from typing import Callable
 
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
 
-from .const import STATE_CAPTURING, STATE_GENERATING, STATE_IDLE, STATE_ERROR
+from .activity import ActivityMonitor
+from .capture_scheduler import CaptureScheduler
+from .const import (
+    CATALOG_FILENAME,
+    EVENT_TIMELAPSE_FINISHED,
+    INGESTION_STREAM,
+    QUALITY_GATE_OFF,
+    QUALITY_GATE_REJECT,
+    STATE_SAVE_DELAY,
+    STATE_CAPTURING,
+    STATE_ERROR,
+    STATE_GENERATING,
+    STATE_IDLE,
+    STORAGE_PACKED,
+)
+from .ffmpeg import (
+    ENCODER_PROFILES,
+    LiveEncoder,
+    Rendition,
+    concat_videos,
+    encode_frames,
+    encode_frames_parallel,
+    encode_renditions,
+    recover_live_videos,
+)
+from .frame_analysis import (
+    BLACK_LUMINANCE,
+    DEFECT_BLACK,
+    DEFECT_CORRUPT,
+    FRAME_DEFECTS,
+    FrameRejected,
+    analyze_frame,
+    check_jpeg,
+    hash_distance,
+)
+from .frame_catalog import (
+    FRAME_TIMESTAMP_FORMAT,
+    Frame,
+    FrameCatalog,
+    Segment,
+    adopt_flat_sessions,
+    find_flat_sessions,
+    session_dir,
+)
+from .frame_selection import select_frames
+from .frame_store import FrameLock, PackedFrameStore, export_frames
+from .frame_stream import FrameStream
+from .frame_writer import FrameWriter
 from .frigate_api import FrigateAPI
+from .jobs import JOB_CANCELLED, JOB_DONE, JOB_FAILED, EncodeJob, JobGroup
+from .retention import RetentionEngine
+from .scheduler import PRIORITY_BATCH, PRIORITY_MANUAL, EncodeScheduler
 
 _LOGGER = logging.getLogger(__name__)
 
+# Number of finished jobs kept for status reporting
+MAX_JOB_HISTORY = 10
+
+# Share of the capture interval a snapshot request may take
+CAPTURE_TIMEOUT_RATIO = 0.8
+MAX_CAPTURE_TIMEOUT = 60  # seconds
+
+# Once activity ends the interval grows by this factor per capture until it
+# is back at the configured baseline
+ACTIVITY_DECAY_FACTOR = 2
+
 
 class TimelapseManager:
     """Manage timelapse capture and generation."""
@@ -26,27 +88,110 @@ class TimelapseManager:
         self,
         hass: HomeAssistant,
         frigate_api: FrigateAPI,
+        scheduler: EncodeScheduler,
+        capture_scheduler: CaptureScheduler,
+        frame_writer: FrameWriter,
+        retention: RetentionEngine,
         camera: str,
         capture_interval: int,
         output_path: str,
         fps: int,
         resolution: str,
+        live_encode: bool = False,
+        segment_minutes: int = 0,
+        parallel_encoding: bool = False,
+        duplicate_threshold: int = 0,
+        snapshot_quality: int | None = None,
+        storage: str = "files",
+        thinning: bool = False,
+        quota_mb: int = 0,
+        global_quota_mb: int = 0,
+        encoder_profile: str = "normal",
+        encoder_threads: int = 0,
+        encoder_cpu_seconds: int = 0,
+        encoder_memory_mb: int = 0,
+        off_peak_start: int = 0,
+        off_peak_end: int = 0,
+        activity: ActivityMonitor | None = None,
+        active_interval: int = 0,
+        ingestion: str = "poll",
+        quality_gate: str = "tag",
+        store: Store | None = None,
+        adopt_sessions: bool = False,
     ) -> None:
         """Initialize the timelapse manager."""
         self.hass = hass
         self.frigate_api = frigate_api
+        self.scheduler = scheduler
+        self.capture_scheduler = capture_scheduler
+        self.frame_writer = frame_writer
+        self.retention = retention
         self.camera = camera
         self.capture_interval = capture_interval
         self.output_path = output_path
         self.fps = fps
         self.resolution = resolution
+        self.live_encode = live_encode
+        self.segment_minutes = segment_minutes
+        self.parallel_encoding = parallel_encoding
+        self.duplicate_threshold = duplicate_threshold
+        self.snapshot_quality = snapshot_quality
+        self.storage = storage
+        self.thinning = thinning
+        self.quota_mb = quota_mb
+        self.global_quota_mb = global_quota_mb
+        self.encoder_limits = replace(
+            ENCODER_PROFILES[encoder_profile],
+            max_threads=encoder_threads or None,
+            cpu_seconds=encoder_cpu_seconds or None,
+            memory_mb=encoder_memory_mb or None,
+        )
+        self.off_peak = (
+            (off_peak_start, off_peak_end) if off_peak_start != off_peak_end else None
+        )
+        self.activity = activity
+        self.active_interval = min(active_interval, capture_interval)
+        self.ingestion = ingestion
+        self.quality_gate = quality_gate
+        self.store = store
+        # Sessions of older versions belong to this camera if it is the only
+        # one using the output path
+        self.adopt_sessions = adopt_sessions
 
         self._state = STATE_IDLE
         self._last_capture: datetime | None = None
         self._images_count = 0
         self._current_session: str | None = None
+        self._resume_capture = False
         self._capture_task = None
         self._state_callbacks: list[Callable] = []
+        self._catalog = FrameCatalog(Path(hass.config.path(CATALOG_FILENAME)))
+        self._live_encoder: LiveEncoder | None = None
+        self._last_timelapse: str | None = None
+        self._segment_task: asyncio.Task | None = None
+        # Segments ffmpeg failed on, their frames are left to the tail encode
+        self._failed_segments: set[Path] = set()
+        self._jobs: dict[str, EncodeJob] = {}
+        self._job_groups: dict[str, JobGroup] = {}
+        self._capture_lock = asyncio.Lock()
+        self._last_deadline: datetime | None = None
+        self._capture_lag: float | None = None
+        self._skipped_captures = 0
+        self._missed_ticks = 0
+        self._failed_captures = 0
+        self._duplicate_frames = 0
+        self._defective_frames = dict.fromkeys(FRAME_DEFECTS, 0)
+        self._last_kept_hash: int | None = None
+        self._last_kept: Frame | None = None
+        self._last_kept_generation = 0
+        self.frame_lock = FrameLock()
+        self._frame_store = PackedFrameStore() if storage == STORAGE_PACKED else None
+        self._snapshot_height: int | None = None
+        self._unregister_retention: Callable[[], None] | None = None
+        self._interval: float = capture_interval
+        self._objects_active = False
+        self._unsub_activity: Callable[[], None] | None = None
+        self._frame_stream: FrameStream | None = None
 
     @property
     def state(self) -> str:
@@ -63,6 +208,186 @@ class TimelapseManager:
         """Get number of captured images in current session."""
         return self._images_count
 
+    @property
+    def current_session(self) -> str | None:
+        """Get the session frames are captured into."""
+        return self._current_session
+
+    @property
+    def catalog(self) -> FrameCatalog:
+        """Get the frame catalog."""
+        return self._catalog
+
+    @property
+    def last_timelapse(self) -> str | None:
+        """Get path of the last generated timelapse."""
+        return self._last_timelapse
+
+    @property
+    def capture_lag(self) -> float | None:
+        """Get seconds between the last scheduled tick and its capture."""
+        return self._capture_lag
+
+    @property
+    def capture_stats(self) -> dict[str, float]:
+        """Get capture counters and the interval currently captured at."""
+        return {
+            "skipped_captures": self._skipped_captures,
+            "missed_ticks": self._missed_ticks,
+            "failed_captures": self._failed_captures,
+            "duplicate_frames": self._duplicate_frames,
+            **{
+                f"{defect}_frames": count
+                for defect, count in self._defective_frames.items()
+            },
+            "capture_interval": self._interval,
+        }
+
+    @property
+    def capture_timeout(self) -> float:
+        """Get the snapshot request timeout derived from the interval."""
+        return min(MAX_CAPTURE_TIMEOUT, self._interval * CAPTURE_TIMEOUT_RATIO)
+
+    @property
+    def active_job(self) -> EncodeJob | None:
+        """Get the most recent queued or running job."""
+        for job in reversed(self._jobs.values()):
+            if job.active:
+                return job
+        return None
+
+    @property
+    def _idle_state(self) -> str:
+        """Get the state to return to when no job is running."""
+        return STATE_CAPTURING if self._capture_task else STATE_IDLE
+
+    async def async_setup(self) -> None:
+        """Open the frame catalog, indexing existing captures if needed."""
+        try:
+            await self.hass.async_add_executor_job(self._catalog.open)
+            await self._async_adopt_flat_sessions()
+            await self.hass.async_add_executor_job(
+                self._catalog.rebuild, Path(self.output_path), self.camera
+            )
+            await self._async_restore_state()
+            await self._async_recover_live_videos()
+            await self._async_update_snapshot_height()
+        except BaseException:
+            await self.hass.async_add_executor_job(self._catalog.close)
+            raise
+        self._unregister_retention = self.retention.register(self)
+
+    async def _async_adopt_flat_sessions(self) -> None:
+        """Move sessions captured before frames were split by camera."""
+        output_path = Path(self.output_path)
+        if self.adopt_sessions:
+            await self.hass.async_add_executor_job(
+                adopt_flat_sessions, output_path, self.camera
+            )
+        elif sessions := await self.hass.async_add_executor_job(
+            find_flat_sessions, output_path
+        ):
+            _LOGGER.warning(
+                "%d sessions in %s were captured by an older version and several "
+                "cameras use this path, move them into captures/<camera>/ to "
+                "use them",
+                len(sessions),
+                output_path / "captures",
+            )
+
+    async def _async_restore_state(self) -> None:
+        """Restore the session and counters saved before the last shutdown."""
+        if self.store is None or not (data := await self.store.async_load()):
+            return
+        self._current_session = data.get("session")
+        self._images_count = data.get("images_count", 0)
+        if last_capture := data.get("last_capture"):
+            self._last_capture = datetime.fromisoformat(last_capture)
+        self._last_timelapse = data.get("last_timelapse")
+        self._resume_capture = data.get("capturing", False)
+
+    async def _async_recover_live_videos(self) -> None:
+        """Keep the live videos of runs killed before they were finished."""
+        # Session names are fixed width, so other cameras' videos never match
+        pattern = f"timelapse_{self.camera}_{'[0-9]' * 8}_{'[0-9]' * 6}*.mp4"
+        recovered = await self.hass.async_add_executor_job(
+            recover_live_videos, Path(self.output_path), pattern
+        )
+        if recovered:
+            _LOGGER.warning(
+                "Recovered %d unfinished live encoded timelapses of %s: %s",
+                len(recovered),
+                self.camera,
+                ", ".join(path.name for path in recovered),
+            )
+            self._last_timelapse = str(recovered[-1])
+            self._schedule_save()
+
+    def _state_data(self) -> dict:
+        """Return the state persisted across restarts."""
+        return {
+            "session": self._current_session,
+            "capturing": self._resume_capture,
+            "images_count": self._images_count,
+            "last_capture": (
+                self._last_capture.isoformat() if self._last_capture else None
+            ),
+            "last_timelapse": self._last_timelapse,
+        }
+
+    def _schedule_save(self) -> None:
+        """Persist the state, batching changes into one delayed write."""
+        if self.store is not None:
+            self.store.async_delay_save(self._state_data, STATE_SAVE_DELAY)
+
+    @property
+    def resume_capture(self) -> bool:
+        """Return True if capture was running when the state was saved."""
+        return self._resume_capture
+
+    async def _async_update_snapshot_height(self) -> None:
+        """Ask Frigate for snapshots no taller than the output resolution."""
+        target_height = int(self.resolution.split("x")[1])
+        camera_config = await self.frigate_api.get_camera_config(self.camera) or {}
+        source_height = camera_config.get("detect", {}).get("height")
+
+        # Never ask Frigate to upscale
+        if source_height and source_height <= target_height:
+            self._snapshot_height = None
+        else:
+            self._snapshot_height = target_height
+        _LOGGER.debug(
+            "Requesting %s snapshots at height %s (source %s)",
+            self.camera,
+            self._snapshot_height,
+            source_height,
+        )
+
+    async def async_shutdown(self) -> None:
+        """Stop capturing and save the state before Home Assistant stops.
+
+        A running capture stays flagged to resume on setup.
+        """
+        await self._async_stop_capture()
+        if self.store is not None:
+            await self.store.async_save(self._state_data())
+
+    async def async_close(self) -> None:
+        """Release resources held by the manager."""
+        await self.async_shutdown()
+        if self._unregister_retention is not None:
+            self._unregister_retention()
+            self._unregister_retention = None
+        if self._segment_task is not None:
+            self._segment_task.cancel()
+        self.cancel_timelapse()
+        await self.hass.async_add_executor_job(self._catalog.close)
+
+    @property
+    def _encode_params(self) -> str:
+        """Return a key identifying settings that segments must share."""
+        return f"{self.resolution}@{self.fps}"
+
     def register_state_callback(self, callback: Callable) -> None:
         """Register a callback for state changes."""
         self._state_callbacks.append(callback)
@@ -70,250 +395,956 @@ class TimelapseManager:
     def _set_state(self, state: str) -> None:
         """Set state and notify callbacks."""
         self._state = state
+        self._notify()
+
+    def _notify(self) -> None:
+        """Notify callbacks that state or progress changed."""
         for callback in self._state_callbacks:
-            self.hass.async_create_task(callback())
+            callback()
 
-    async def start_capture(self) -> None:
-        """Start periodic image capture."""
-        if self._state == STATE_CAPTURING:
+    async def start_capture(self, resume: bool = False) -> None:
+        """Start periodic image capture.
+
+        With resume, capture continues the stored session if there is one.
+        """
+        # The state is generating while a job runs, whether capturing or not
+        if self._capture_task is not None:
             _LOGGER.warning("Capture already running")
             return
 
-        # Create new session folder
-        self._current_session = datetime.now().strftime("%Y%m%d_%H%M%S")
-        session_path = Path(self.output_path) / "captures" / self._current_session
+        live_suffix = ""
+        if resume and self._current_session:
+            # The interrupted run's live video was finished or recovered
+            live_suffix = datetime.now().strftime("_%H%M%S")
+        else:
+            # Create new session folder
+            self._current_session = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self._images_count = 0
+        session_path = session_dir(
+            Path(self.output_path), self.camera, self._current_session
+        )
         session_path.mkdir(parents=True, exist_ok=True)
 
-        self._images_count = 0
-        self._set_state(STATE_CAPTURING)
+        self._resume_capture = True
+        self._schedule_save()
 
-        _LOGGER.info("Starting capture session: %s", self._current_session)
+        if self.live_encode:
+            await self._start_live_encoder(live_suffix)
 
-        # Schedule periodic captures
-        self._capture_task = async_track_time_interval(
-            self.hass,
-            self._periodic_capture,
-            timedelta(seconds=self.capture_interval),
+        if self.ingestion == INGESTION_STREAM:
+            self._frame_stream = FrameStream(
+                self.hass, self.frigate_api, self.camera, self._snapshot_height
+            )
+            self._frame_stream.start()
+
+        self._set_state(
+            STATE_GENERATING if self.active_job is not None else STATE_CAPTURING
         )
 
+        _LOGGER.info(
+            "%s capture session: %s",
+            "Resuming" if live_suffix else "Starting",
+            self._current_session,
+        )
+
+        # Schedule periodic captures, a pause is not a run of missed ticks
+        self._interval = self.capture_interval
+        self._last_deadline = None
+        self._capture_task = self.capture_scheduler.register(
+            self._interval, self._periodic_capture, self._skip_capture
+        )
+        if self.active_interval and self.activity is not None:
+            self._unsub_activity = self.activity.subscribe(
+                self.camera, self._on_activity
+            )
+
         # Capture first image immediately
         await self.capture_single_image()
 
     async def stop_capture(self) -> None:
         """Stop periodic image capture."""
+        self._resume_capture = False
+        self._schedule_save()
+        await self._async_stop_capture()
+
+    async def _async_stop_capture(self) -> None:
+        """Stop capturing, leaving the resume flag as it is."""
+        if self._unsub_activity is not None:
+            self._unsub_activity()
+            self._unsub_activity = None
+        self._objects_active = False
+
         if self._capture_task:
             self._capture_task()
             self._capture_task = None
+        self._last_deadline = None
 
-        self._set_state(STATE_IDLE)
+        if self._frame_stream is not None:
+            await self._frame_stream.stop()
+            self._frame_stream = None
+
+        if self._live_encoder is not None:
+            await self._finish_live_encoder()
+
+        self._set_state(
+            STATE_GENERATING if self.active_job is not None else self._idle_state
+        )
         _LOGGER.info(
             "Stopped capture session: %s (captured %d images)",
             self._current_session,
             self._images_count,
         )
 
-    async def _periodic_capture(self, now) -> None:
+    async def _start_live_encoder(self, suffix: str = "") -> None:
+        """Start encoding the current session while it is captured."""
+        output_file = f"timelapse_{self.camera}_{self._current_session}{suffix}.mp4"
+        encoder = LiveEncoder(
+            Path(self.output_path) / output_file,
+            self.fps,
+            self.resolution,
+            self.encoder_limits,
+            # Live encoders idle between captures, so they hold no scheduler
+            # slot but use no more threads than a scheduled encode
+            self.scheduler.threads,
+        )
+        try:
+            await encoder.start()
+        except OSError as err:
+            _LOGGER.error("Failed to start live encoder: %s", err)
+            return
+        self._live_encoder = encoder
+
+    async def _finish_live_encoder(self) -> None:
+        """Finalize the live encoded video of the current session."""
+        encoder = self._live_encoder
+        self._live_encoder = None
+        if encoder is None:
+            return
+
+        if await encoder.finish():
+            self._last_timelapse = str(encoder.output_path)
+            self._schedule_save()
+            _LOGGER.info(
+                "Live encoded timelapse ready: %s (%d frames)",
+                encoder.output_path,
+                encoder.frames,
+            )
+
+    def _on_activity(self, active: bool) -> None:
+        """Capture faster while Frigate tracks objects on the camera."""
+        self._objects_active = active
+        if active and self._capture_task is not None:
+            self._set_capture_interval(self.active_interval)
+
+    def _set_capture_interval(self, interval: float) -> None:
+        """Reschedule periodic captures at a new interval."""
+        _LOGGER.debug("Capturing %s every %ss", self.camera, interval)
+        self._interval = interval
+        # Ticks of the old interval are not missed ticks of the new one
+        self._last_deadline = None
+        self.capture_scheduler.set_interval(self._periodic_capture, interval)
+        self._notify()
+
+    async def _periodic_capture(self, deadline: datetime) -> None:
         """Periodic capture callback."""
+        if self._last_deadline is not None:
+            elapsed = (deadline - self._last_deadline).total_seconds()
+            self._missed_ticks += max(0, round(elapsed / self._interval) - 1)
+        self._last_deadline = deadline
+
+        # Slow back down to the baseline once the camera is quiet
+        if not self._objects_active and self._interval < self.capture_interval:
+            self._set_capture_interval(
+                min(self.capture_interval, self._interval * ACTIVITY_DECAY_FACTOR)
+            )
+
+        # Never pile up requests on a slow Frigate
+        if self._capture_lock.locked():
+            self._skip_capture(deadline)
+            return
+
+        self._capture_lag = round((datetime.now() - deadline).total_seconds(), 3)
         await self.capture_single_image()
 
+    def _skip_capture(self, deadline: datetime) -> None:
+        """Count a tick dropped while the previous capture is still running."""
+        self._last_deadline = deadline
+        self._skipped_captures += 1
+        _LOGGER.debug("Previous capture still running, skipping tick")
+        self._notify()
+
     async def capture_single_image(self) -> bool:
         """Capture a single image from the camera."""
-        try:
-            image_data = await self.frigate_api.get_latest_image(self.camera)
-
-            if not image_data:
-                _LOGGER.error("Failed to get image from camera %s", self.camera)
-                return False
+        async with self._capture_lock:
+            success = await self._capture()
+        if not success:
+            self._failed_captures += 1
+            self._notify()
+        return success
 
+    async def _capture(self) -> bool:
+        """Fetch and store one frame."""
+        try:
             # Ensure session exists
             if not self._current_session:
                 self._current_session = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-            session_path = Path(self.output_path) / "captures" / self._current_session
+            session_path = session_dir(
+                Path(self.output_path), self.camera, self._current_session
+            )
             session_path.mkdir(parents=True, exist_ok=True)
 
             # Save image with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-            image_path = session_path / f"frame_{timestamp}.jpg"
-
-            await self.hass.async_add_executor_job(
-                self._save_image, image_path, image_data
+            now = datetime.now()
+            timestamp = now.strftime(FRAME_TIMESTAMP_FORMAT)
+            frame = Frame(
+                camera=self.camera,
+                session=self._current_session,
+                timestamp=now,
+                path=session_path / f"frame_{timestamp}.jpg",
+                size=0,
             )
 
-            self._last_capture = datetime.now()
+            # Packs, the live encoder and streamed frames are whole in memory
+            if (
+                self._frame_store is None
+                and self._live_encoder is None
+                and self._frame_stream is None
+            ):
+                stored = await self._stream_frame(frame)
+            else:
+                stored = await self._fetch_frame(frame)
+            if not stored:
+                _LOGGER.error("Failed to get image from camera %s", self.camera)
+                return False
+
+            if frame.duplicate:
+                self._duplicate_frames += 1
+            if (
+                self.quality_gate != QUALITY_GATE_OFF
+                and frame.luminance is not None
+                and frame.luminance < BLACK_LUMINANCE
+            ):
+                # Kept under the tag policy, selectable with exclude_dark
+                self._defective_frames[DEFECT_BLACK] += 1
+
+            self._last_capture = now
             self._images_count += 1
+            self._schedule_save()
+
+            if self.segment_minutes:
+                self._schedule_segment_encoding()
+
+            _LOGGER.debug("Captured image: %s", frame.path)
+            return True
 
-            _LOGGER.debug("Captured image: %s", image_path)
+        except FrameRejected as err:
+            self._defective_frames[err.defect] += 1
+            _LOGGER.warning("Dropped %s frame from %s", err.defect, self.camera)
+            self._notify()
             return True
 
         except Exception as err:
             _LOGGER.error("Error capturing image: %s", err)
             return False
 
+    async def _fetch_frame(self, frame: Frame) -> bool:
+        """Take the streamed frame or download a snapshot, and store it."""
+        image_data = None
+        if self._frame_stream is not None:
+            image_data = self._frame_stream.latest()
+        if image_data is None:
+            image_data = await self.frigate_api.get_latest_image(
+                self.camera,
+                self.capture_timeout,
+                height=self._snapshot_height,
+                quality=self.snapshot_quality,
+            )
+        if not image_data:
+            return False
+
+        frame.size = len(image_data)
+        async with self.frame_lock.read():
+            self._forget_moved_frame()
+            await self.hass.async_add_executor_job(self._store_frame, frame, image_data)
+
+        if self._live_encoder is not None:
+            await self._live_encoder.add_frame(image_data)
+        return True
+
+    async def _stream_frame(self, frame: Frame) -> bool:
+        """Stream a snapshot straight to its file and record it.
+
+        The file only appears once complete, so a failed or cancelled
+        download never leaves a partial frame in the session.
+        """
+        file = self.frame_writer.open(frame.path)
+        committed = False
+        try:
+            if not await self.frigate_api.stream_latest_image(
+                self.camera,
+                file.write,
+                self.capture_timeout,
+                height=self._snapshot_height,
+                quality=self.snapshot_quality,
+            ):
+                return False
+            frame.size = await file.commit()
+            committed = True
+        finally:
+            if not committed:
+                await file.abort()
+
+        async with self.frame_lock.read():
+            self._forget_moved_frame()
+            await self.hass.async_add_executor_job(self._record_streamed_frame, frame)
+        return True
+
+    def _forget_moved_frame(self) -> None:
+        """Stop pointing duplicates at a kept frame retention may have moved."""
+        if self._last_kept_generation != self.frame_lock.generation:
+            self._last_kept_generation = self.frame_lock.generation
+            self._last_kept = None
+            self._last_kept_hash = None
+
     def _save_image(self, path: Path, data: bytes) -> None:
         """Save image data to file."""
         with open(path, "wb") as f:
             f.write(data)
 
+    def _store_frame(self, frame: Frame, data: bytes) -> None:
+        """Save a frame to disk and record it in the catalog.
+
+        With duplicate suppression enabled, a frame whose perceptual hash is
+        within the threshold of the last kept frame is not written; its
+        catalog entry points at the kept frame so video timing is preserved.
+        """
+        self._check_frame(data)
+        frame_hash = self._analyze_frame(frame, data)
+        if not frame.duplicate:
+            if self._frame_store is not None:
+                frame.path, frame.offset = self._frame_store.append(
+                    frame.path.parent, frame.timestamp, data
+                )
+            else:
+                self._save_image(frame.path, data)
+        self._record_frame(frame, frame_hash)
+
+    def _record_streamed_frame(self, frame: Frame) -> None:
+        """Record a frame already on disk, dropping it if it is a duplicate."""
+        written = frame.path
+        try:
+            self._check_frame(written)
+            frame_hash = self._analyze_frame(frame, written)
+        except FrameRejected:
+            written.unlink(missing_ok=True)
+            raise
+        if frame.duplicate:
+            written.unlink(missing_ok=True)
+        self._record_frame(frame, frame_hash)
+
+    def _check_frame(self, image: bytes | Path) -> None:
+        """Raise FrameRejected if the JPEG structure of a frame is broken."""
+        if self.quality_gate == QUALITY_GATE_OFF:
+            return
+        if defect := check_jpeg(image):
+            raise FrameRejected(defect)
+
+    def _analyze_frame(self, frame: Frame, image: bytes | Path) -> int | None:
+        """Measure a frame and point it at the last kept frame if they match.
+
+        Statistics are stored on the frame for selection at generation time.
+        Returns the perceptual hash of the frame, if it could be decoded.
+        Under the quality gate, undecodable frames and, with the reject
+        policy, black frames raise FrameRejected.
+        """
+        try:
+            frame_hash, statistics = analyze_frame(image)
+        except OSError as err:
+            if self.quality_gate != QUALITY_GATE_OFF:
+                raise FrameRejected(DEFECT_CORRUPT) from err
+            _LOGGER.debug("Could not analyze frame %s: %s", frame.path, err)
+            return None
+
+        if (
+            self.quality_gate == QUALITY_GATE_REJECT
+            and statistics.luminance < BLACK_LUMINANCE
+        ):
+            raise FrameRejected(DEFECT_BLACK)
+
+        frame.luminance = statistics.luminance
+        frame.contrast = statistics.contrast
+        frame.sharpness = statistics.sharpness
+
+        kept = self._last_kept
+        if (
+            self.duplicate_threshold
+            and self._last_kept_hash is not None
+            and kept is not None
+            and kept.session == frame.session
+            and hash_distance(frame_hash, self._last_kept_hash)
+            <= self.duplicate_threshold
+        ):
+            frame.path = kept.path
+            frame.offset = kept.offset
+            frame.size = kept.size
+            frame.duplicate = True
+        return frame_hash
+
+    def _record_frame(self, frame: Frame, frame_hash: int | None) -> None:
+        """Add a stored frame to the catalog."""
+        self._catalog.add_frame(frame)
+        if not frame.duplicate:
+            self._last_kept_hash = frame_hash
+            self._last_kept = frame
+
+    def _schedule_segment_encoding(self) -> None:
+        """Encode closed time buckets in the background if not already busy."""
+        if self._segment_task is not None and not self._segment_task.done():
+            return
+        self._segment_task = self.hass.async_create_task(
+            self._encode_closed_segments(self._current_session)
+        )
+
+    async def _encode_closed_segments(self, session: str) -> None:
+        """Encode every closed, not yet encoded bucket of a session."""
+        try:
+            bucket_seconds = self.segment_minutes * 60
+            now = datetime.now().timestamp()
+            open_bucket_start = datetime.fromtimestamp(now - now % bucket_seconds)
+
+            generation = self.frame_lock.generation
+            encoded_end = await self.hass.async_add_executor_job(
+                self._catalog.get_segments_end,
+                self.camera,
+                session,
+                self._encode_params,
+            )
+            frames = await self.hass.async_add_executor_job(
+                self._catalog.get_frames,
+                self.camera,
+                session,
+                encoded_end,
+                open_bucket_start,
+            )
+            frames = [
+                frame
+                for frame in frames
+                if frame.timestamp < open_bucket_start
+                and (encoded_end is None or frame.timestamp > encoded_end)
+            ]
+
+            buckets: dict[float, list[Frame]] = {}
+            for frame in frames:
+                ts = frame.timestamp.timestamp()
+                buckets.setdefault(ts - ts % bucket_seconds, []).append(frame)
+
+            for bucket_start, bucket_frames in sorted(buckets.items()):
+                # A single frame is no video, the tail encode covers it
+                if len(bucket_frames) < 2:
+                    continue
+                await self._encode_segment(
+                    session, bucket_start, bucket_frames, generation
+                )
+        except Exception as err:
+            _LOGGER.error("Error encoding segments: %s", err)
+
+    async def _encode_segment(
+        self,
+        session: str,
+        bucket_start: float,
+        frames: list[Frame],
+        generation: int,
+    ) -> None:
+        """Encode one closed bucket into an immutable segment file.
+
+        Frames were loaded at the given frame lock generation.
+        """
+        segments_dir = Path(self.output_path) / "segments" / self.camera / session
+        segments_dir.mkdir(parents=True, exist_ok=True)
+        name = datetime.fromtimestamp(bucket_start).strftime("%Y%m%d_%H%M%S")
+        segment_path = segments_dir / f"segment_{name}_{self.resolution}_{self.fps}.mp4"
+        if segment_path in self._failed_segments:
+            return
+
+        async def encode(threads: int) -> bool:
+            nonlocal frames
+            async with self.frame_lock.read():
+                frames = await self._reload_frames(frames, generation)
+                return len(frames) > 1 and await encode_frames(
+                    frames,
+                    segment_path,
+                    self.fps,
+                    self.resolution,
+                    threads,
+                    limits=self.encoder_limits,
+                )
+
+        if not await self.scheduler.submit(
+            str(segment_path), encode, PRIORITY_BATCH, self.off_peak
+        ):
+            # Retention may have thinned the bucket below two frames
+            if len(frames) > 1:
+                _LOGGER.error("Failed to encode segment %s", segment_path)
+                self._failed_segments.add(segment_path)
+            return
+
+        await self.hass.async_add_executor_job(
+            self._catalog.add_segment,
+            Segment(
+                camera=self.camera,
+                session=session,
+                start=frames[0].timestamp,
+                end=frames[-1].timestamp,
+                frame_count=len(frames),
+                path=segment_path,
+                params=self._encode_params,
+            ),
+        )
+        _LOGGER.debug("Encoded segment %s (%d frames)", segment_path, len(frames))
+
+    async def _reload_frames(self, frames: list[Frame], generation: int) -> list[Frame]:
+        """Reload frames retention may have moved or deleted since generation.
+
+        Must be called holding the frame lock for reading.
+        """
+        if self.frame_lock.generation == generation:
+            return frames
+        return await self.hass.async_add_executor_job(
+            self._catalog.get_frames_by_id, [frame.frame_id for frame in frames]
+        )
+
     async def generate_timelapse(
         self,
         start_time: datetime | None = None,
         end_time: datetime | None = None,
         output_file: str | None = None,
+        duration: float | None = None,
+        max_frames: int | None = None,
+        selection: list[str] | None = None,
+        renditions: list[Rendition] | None = None,
     ) -> str | None:
         """Generate timelapse video from captured images."""
+        job = await self.async_run_job(
+            start_time,
+            end_time,
+            output_file,
+            duration=duration,
+            max_frames=max_frames,
+            selection=selection,
+            renditions=renditions,
+        )
+        return str(job.output_path) if job.status == JOB_DONE else None
+
+    async def async_run_job(
+        self,
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+        output_file: str | None = None,
+        priority: int = PRIORITY_MANUAL,
+        duration: float | None = None,
+        max_frames: int | None = None,
+        selection: list[str] | None = None,
+        renditions: list[Rendition] | None = None,
+    ) -> EncodeJob:
+        """Generate a timelapse as a cancellable job and wait for it.
+
+        Without a time range the current session is used, otherwise frames
+        of every session in the range. Selection policies (see
+        frame_selection) filter frames by their capture statistics, then a
+        target duration in seconds or a frame budget limits the video to
+        evenly spaced frames. Renditions are all encoded by one ffmpeg run,
+        each to the output name suffixed with its resolution and container.
+        """
+        policies = tuple(selection or ())
+        budgets = [int(max_frames)] if max_frames else []
+        if duration:
+            budgets.append(max(2, round(duration * self.fps)))
+        frame_budget = min(budgets) if budgets else None
+
+        # Identical requests share a single encode, ranges span sessions
+        key = "|".join(
+            str(part)
+            for part in (
+                self.camera,
+                None if start_time or end_time else self._current_session,
+                start_time,
+                end_time,
+                frame_budget,
+                ",".join(policies),
+                renditions,
+                self._encode_params,
+                output_file or "auto",
+            )
+        )
+
+        # Generate output filename
+        if not output_file:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_file = f"timelapse_{self.camera}_{timestamp}.mp4"
+
+        output_path = Path(self.output_path) / output_file
+        outputs = [
+            output_path.with_name(f"{output_path.stem}{rendition.suffix}")
+            for rendition in renditions or ()
+        ]
+        job = EncodeJob(
+            camera=self.camera,
+            output_path=outputs[0] if outputs else output_path,
+            outputs=outputs,
+            on_update=self._notify,
+        )
+        self._jobs[job.job_id] = job
+        # Only finished jobs are forgotten, others must stay cancellable
+        finished = [job_id for job_id, old in self._jobs.items() if not old.active]
+        for job_id in finished[: len(self._jobs) - MAX_JOB_HISTORY]:
+            del self._jobs[job_id]
+
         self._set_state(STATE_GENERATING)
+        job.task = self.hass.async_create_task(
+            self._run_job(
+                job,
+                start_time,
+                end_time,
+                frame_budget,
+                policies,
+                renditions,
+                key,
+                priority,
+            )
+        )
+        try:
+            await asyncio.wait({job.task})
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+
+        if job.task.cancelled():
+            _LOGGER.info("Timelapse job %s cancelled", job.job_id)
+            job.finish(JOB_CANCELLED)
+        elif job.status == JOB_DONE:
+            _LOGGER.info("Generated timelapse: %s", job.output_path)
+            self._last_timelapse = str(job.output_path)
+            self._schedule_save()
+
+        self._set_state(STATE_ERROR if job.status == JOB_FAILED else self._idle_state)
+        self.hass.bus.async_fire(EVENT_TIMELAPSE_FINISHED, job.as_dict())
+        return job
 
+    async def _run_job(
+        self,
+        job: EncodeJob,
+        start_time: datetime | None,
+        end_time: datetime | None,
+        frame_budget: int | None,
+        policies: tuple[str, ...],
+        renditions: list[Rendition] | None,
+        key: str,
+        priority: int,
+    ) -> None:
+        """Select frames and encode them, recording the outcome on the job."""
         try:
-            # Use current session if not specified
-            if not self._current_session:
+            # A time range may span sessions, otherwise use the current one
+            session = None if start_time or end_time else self._current_session
+            if session is None and not (start_time or end_time):
                 _LOGGER.error("No capture session available")
-                self._set_state(STATE_ERROR)
-                return None
-
-            session_path = Path(self.output_path) / "captures" / self._current_session
-
-            if not session_path.exists():
-                _LOGGER.error("Session path does not exist: %s", session_path)
-                self._set_state(STATE_ERROR)
-                return None
-
-            # Get list of images
-            images = sorted(session_path.glob("frame_*.jpg"))
-
-            # Filter by time range if specified
-            if start_time or end_time:
-                filtered_images = []
-                for img in images:
-                    # Extract timestamp from filename
-                    timestamp_str = img.stem.replace("frame_", "")
-                    img_time = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S_%f")
-
-                    if start_time and img_time < start_time:
-                        continue
-                    if end_time and img_time > end_time:
-                        continue
-                    filtered_images.append(img)
-                images = filtered_images
-
-            if len(images) < 2:
+                job.finish(JOB_FAILED, "No capture session available")
+                return
+
+            # Get list of images in the requested time range
+            generation = self.frame_lock.generation
+            frames = await self.hass.async_add_executor_job(
+                self._select_frames,
+                session,
+                start_time,
+                end_time,
+                frame_budget,
+                policies,
+            )
+
+            if len(frames) < 2:
                 _LOGGER.error(
-                    "Not enough images to create timelapse (found %d)", len(images)
+                    "Not enough images to create timelapse (found %d)", len(frames)
+                )
+                job.finish(JOB_FAILED, f"Not enough images (found {len(frames)})")
+                return
+
+            # Segments hold every frame at the configured encode settings, so
+            # they only fit unsampled sessions encoded to a single output
+            segments: list[Segment] = []
+            if (
+                self.segment_minutes
+                and session
+                and not (frame_budget or policies or renditions)
+            ):
+                segments = await self.hass.async_add_executor_job(
+                    self._catalog.get_segments,
+                    self.camera,
+                    session,
+                    self._encode_params,
+                    start_time,
+                    end_time,
                 )
-                self._set_state(STATE_ERROR)
-                return None
 
             # Create output directory
-            output_dir = Path(self.output_path)
-            output_dir.mkdir(parents=True, exist_ok=True)
+            job.output_path.parent.mkdir(parents=True, exist_ok=True)
+            job.total_frames = len(frames)
 
-            # Generate output filename
-            if not output_file:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                output_file = f"timelapse_{self.camera}_{timestamp}.mp4"
+            # Jobs joining this request get the state and progress of the
+            # encode started by its first job
+            group = self._job_groups.setdefault(key, JobGroup())
 
-            output_path = output_dir / output_file
+            async def encode(threads: int) -> list[Path] | None:
+                async with self.frame_lock.read():
+                    return await encode_locked(threads)
 
-            # Generate timelapse using ffmpeg
-            success = await self.hass.async_add_executor_job(
-                self._run_ffmpeg, session_path, output_path
-            )
+            async def encode_locked(threads: int) -> list[Path] | None:
+                nonlocal frames, segments
+                if self.frame_lock.generation != generation:
+                    frames = await self._reload_frames(frames, generation)
+                    if segments:
+                        segments = await self.hass.async_add_executor_job(
+                            self._catalog.get_segments,
+                            self.camera,
+                            session,
+                            self._encode_params,
+                            start_time,
+                            end_time,
+                        )
+                    if len(frames) < 2:
+                        return None
+                group.start()
+                try:
+                    if renditions:
+                        success = await encode_renditions(
+                            frames,
+                            list(zip(renditions, job.outputs)),
+                            self.fps,
+                            threads=threads,
+                            progress=group.add_frames,
+                            limits=self.encoder_limits,
+                        )
+                    elif segments:
+                        success = await self._assemble_from_segments(
+                            frames, segments, job.output_path, group.add_frames, threads
+                        )
+                    else:
+                        success = await self._run_ffmpeg(
+                            frames,
+                            job.output_path,
+                            group.add_frames,
+                            threads,
+                        )
+                except asyncio.CancelledError:
+                    for path in job.outputs or [job.output_path]:
+                        path.unlink(missing_ok=True)
+                    raise
+                return (job.outputs or [job.output_path]) if success else None
+
+            # A shared encode may have written to another job's paths
+            # Only batch encodes wait for the off-peak window
+            group.attach(job)
+            try:
+                outputs = await self.scheduler.submit(
+                    key,
+                    encode,
+                    priority,
+                    self.off_peak if priority >= PRIORITY_BATCH else None,
+                )
+            finally:
+                group.detach(job)
+                if not group.jobs and self._job_groups.get(key) is group:
+                    del self._job_groups[key]
 
-            if success:
-                _LOGGER.info("Generated timelapse: %s", output_path)
-                self._set_state(STATE_IDLE)
-                return str(output_path)
+            if outputs is not None:
+                job.output_path = outputs[0]
+                job.outputs = outputs if renditions else []
+                job.finish(JOB_DONE)
             else:
                 _LOGGER.error("Failed to generate timelapse")
-                self._set_state(STATE_ERROR)
-                return None
+                job.finish(JOB_FAILED, "ffmpeg failed")
 
         except Exception as err:
             _LOGGER.error("Error generating timelapse: %s", err)
-            self._set_state(STATE_ERROR)
-            return None
+            job.finish(JOB_FAILED, str(err))
 
-    def _run_ffmpeg(self, input_path: Path, output_path: Path) -> bool:
-        """Run ffmpeg to create timelapse video."""
-        try:
-            # Parse resolution
-            width, height = self.resolution.split("x")
-
-            # ffmpeg command to create timelapse
-            cmd = [
-                "ffmpeg",
-                "-y",  # Overwrite output file
-                "-framerate",
-                str(self.fps),
-                "-pattern_type",
-                "glob",
-                "-i",
-                str(input_path / "frame_*.jpg"),
-                "-c:v",
-                "libx264",
-                "-pix_fmt",
-                "yuv420p",
-                "-vf",
-                f"scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2",
-                "-preset",
-                "medium",
-                "-crf",
-                "23",
-                str(output_path),
-            ]
+    def _select_frames(
+        self,
+        session: str | None,
+        start_time: datetime | None,
+        end_time: datetime | None,
+        frame_budget: int | None,
+        policies: tuple[str, ...],
+    ) -> list[Frame]:
+        """Pick the frames to encode, only loading the chosen ones."""
+        if not frame_budget and not policies:
+            return self._catalog.get_frames(self.camera, session, start_time, end_time)
 
-            _LOGGER.debug("Running ffmpeg command: %s", " ".join(cmd))
+        rows = self._catalog.get_frame_index(self.camera, session, start_time, end_time)
+        frame_ids = select_frames(rows, policies, frame_budget)
+        return self._catalog.get_frames_by_id(frame_ids)
 
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=300,  # 5 minutes timeout
+    async def _run_ffmpeg(
+        self,
+        frames: list[Frame],
+        output_path: Path,
+        progress: Callable[[int], None] | None = None,
+        threads: int | None = None,
+    ) -> bool:
+        """Run ffmpeg to create timelapse video from an explicit frame list."""
+        if self.parallel_encoding:
+            success = await encode_frames_parallel(
+                frames,
+                output_path,
+                self.fps,
+                self.resolution,
+                workers=threads,
+                progress=progress,
+                limits=self.encoder_limits,
             )
+        else:
+            success = await encode_frames(
+                frames,
+                output_path,
+                self.fps,
+                self.resolution,
+                threads=threads,
+                progress=progress,
+                limits=self.encoder_limits,
+            )
+        if success:
+            _LOGGER.info("ffmpeg completed successfully")
+        return success
 
-            if result.returncode == 0:
-                _LOGGER.info("ffmpeg completed successfully")
+    async def _assemble_from_segments(
+        self,
+        frames: list[Frame],
+        segments: list[Segment],
+        output_path: Path,
+        progress: Callable[[int], None],
+        threads: int | None = None,
+    ) -> bool:
+        """Encode frames not covered by segments and stream-copy everything."""
+        parts_dir = output_path.with_name(f".{output_path.stem}.parts")
+        parts_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            parts: list[Path] = []
+            pending: list[Frame] = []
+            remaining = list(segments)
+
+            async def flush() -> bool:
+                if not pending:
+                    return True
+                part_path = parts_dir / f"part_{len(parts):05d}.mp4"
+                if not await self._run_ffmpeg(pending, part_path, progress, threads):
+                    return False
+                parts.append(part_path)
+                pending.clear()
                 return True
-            else:
-                _LOGGER.error("ffmpeg failed: %s", result.stderr)
+
+            for frame in frames:
+                while remaining and remaining[0].end < frame.timestamp:
+                    remaining.pop(0)
+                segment = remaining[0] if remaining else None
+                if segment is None or frame.timestamp < segment.start:
+                    pending.append(frame)
+                    continue
+                # Frame is covered by a segment, reuse it once
+                if parts[-1:] != [segment.path]:
+                    if not await flush():
+                        return False
+                    parts.append(segment.path)
+                    progress(segment.frame_count)
+
+            if not await flush():
                 return False
 
-        except subprocess.TimeoutExpired:
-            _LOGGER.error("ffmpeg timed out")
-            return False
-        except Exception as err:
-            _LOGGER.error("Error running ffmpeg: %s", err)
-            return False
+            _LOGGER.debug(
+                "Assembling %s from %d parts (%d segments reused)",
+                output_path,
+                len(parts),
+                len(segments),
+            )
+            return await concat_videos(parts, output_path, self.encoder_limits)
+        finally:
+            await self.hass.async_add_executor_job(
+                partial(shutil.rmtree, parts_dir, ignore_errors=True)
+            )
+
+    def cancel_timelapse(self, job_id: str | None = None) -> bool:
+        """Cancel a running timelapse job, or all of them."""
+        cancelled = False
+        for job in list(self._jobs.values()):
+            if job_id is None or job.job_id == job_id:
+                cancelled = job.cancel() or cancelled
+        return cancelled
+
+    async def export_frames(
+        self, session: str | None = None, destination: str | None = None
+    ) -> int:
+        """Write the frames of a session out as loose JPEG files."""
+        session = session or self._current_session
+        if session is None:
+            _LOGGER.error("No capture session available")
+            return 0
+
+        destination_path = (
+            Path(destination)
+            if destination
+            else Path(self.output_path) / "exports" / self.camera / session
+        )
+        async with self.frame_lock.read():
+            frames = await self.hass.async_add_executor_job(
+                self._catalog.get_frames, self.camera, session
+            )
+            written = await self.hass.async_add_executor_job(
+                export_frames, frames, destination_path
+            )
+        _LOGGER.info(
+            "Exported %d frames of %s to %s", written, session, destination_path
+        )
+        return written
 
     async def cleanup_old_sessions(self, days: int = 7) -> None:
         """Clean up old capture sessions."""
         try:
-            captures_path = Path(self.output_path) / "captures"
-            if not captures_path.exists():
-                return
-
             cutoff = datetime.now() - timedelta(days=days)
 
-            for session_dir in captures_path.iterdir():
-                if not session_dir.is_dir():
-                    continue
+            sessions = await self.hass.async_add_executor_job(
+                self._catalog.get_sessions_before, self.camera, cutoff
+            )
 
-                # Parse session timestamp
-                try:
-                    session_time = datetime.strptime(session_dir.name, "%Y%m%d_%H%M%S")
-                    if session_time < cutoff:
-                        await self.hass.async_add_executor_job(
-                            self._remove_directory, session_dir
-                        )
-                        _LOGGER.info("Cleaned up old session: %s", session_dir.name)
-                except ValueError:
+            for session in sessions:
+                if session == self._current_session:
                     continue
+                # Frames being read by an encode or view stay put
+                async with self.frame_lock.write() as acquired:
+                    if not acquired:
+                        _LOGGER.warning(
+                            "Frames of %s are in use, postponing cleanup", self.camera
+                        )
+                        return
+                    await self._async_remove_session(session)
 
         except Exception as err:
             _LOGGER.error("Error cleaning up old sessions: %s", err)
 
+    async def _async_remove_session(self, session: str) -> None:
+        """Delete the frames, segments and thumbnails of a session."""
+        captures_dir = session_dir(Path(self.output_path), self.camera, session)
+        if captures_dir.exists():
+            await self.hass.async_add_executor_job(self._remove_directory, captures_dir)
+        for kind in ("segments", "thumbnails"):
+            cache_dir = Path(self.output_path) / kind / self.camera / session
+            if cache_dir.exists():
+                await self.hass.async_add_executor_job(
+                    self._remove_directory, cache_dir
+                )
+        await self.hass.async_add_executor_job(
+            self._catalog.delete_session, self.camera, session
+        )
+        _LOGGER.info("Cleaned up old session: %s", session)
+
     def _remove_directory(self, path: Path) -> None:
         """Remove directory and its contents."""
-        import shutil
-
         shutil.rmtree(path)
@@ -119,6 +119,47 @@ class FrigateTimelapseCard extends HTMLElement {
             text-align: center;
             color: var(--secondary-text-color);
           }
+          .browser-section {
+            margin-top: 16px;
+          }
+          .browser-header {
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+          }
+          .btn-browse {
+            flex: 0 0 auto;
+            background-color: var(--primary-color);
+            color: white;
+          }
+          .frame-viewer {
+            position: relative;
+            margin-top: 8px;
+          }
+          .frame-tile,
+          .frame-full {
+            width: 100%;
+            display: block;
+            background-color: black;
+            background-repeat: no-repeat;
+            border-radius: 8px;
+          }
+          .frame-full {
+            position: absolute;
+            top: 0;
+            left: 0;
+            height: 100%;
+            object-fit: contain;
+          }
+          .frame-slider {
+            width: 100%;
+            margin-top: 8px;
+          }
+          .frame-time {
+            text-align: center;
+            font-size: 12px;
+            color: var(--secondary-text-color);
+          }
           ha-icon {
             --mdi-icon-size: 20px;
           }
@@ -171,6 +212,22 @@ class FrigateTimelapseCard extends HTMLElement {
               </div>
             </div>
           </div>
+
+          <div class="browser-section">
+            <div class="browser-header">
+              <h3>Explorar Fotogramas</h3>
+              <button class="control-button btn-browse" id="btn-browse">
+                <ha-icon icon="mdi:image-multiple"></ha-icon>
+                Cargar
+              </button>
+            </div>
+            <div class="frame-viewer" id="frame-viewer" hidden>
+              <div class="frame-tile" id="frame-tile"></div>
+              <img class="frame-full" id="frame-full" hidden />
+            </div>
+            <input class="frame-slider" id="frame-slider" type="range" min="0" value="0" hidden />
+            <div class="frame-time" id="frame-time"></div>
+          </div>
         </div>
       `;
       this.shadowRoot.appendChild(this.content);
@@ -196,6 +253,120 @@ class FrigateTimelapseCard extends HTMLElement {
     btnGenerate.addEventListener("click", () =>
       this._callService("generate_timelapse")
     );
+
+    const btnBrowse = this.shadowRoot.getElementById("btn-browse");
+    const slider = this.shadowRoot.getElementById("frame-slider");
+    btnBrowse.addEventListener("click", () => this._loadFrames());
+    // Scrub through sprite tiles, then fetch a sharper thumbnail on release
+    slider.addEventListener("input", () => this._showTile(Number(slider.value)));
+    slider.addEventListener("change", () =>
+      this._showThumbnail(Number(slider.value))
+    );
+  }
+
+  async _loadFrames() {
+    if (!this._entryId) {
+      const entry = await this._hass.callWS({
+        type: "config/entity_registry/get",
+        entity_id: this.config.entity,
+      });
+      this._entryId = entry.config_entry_id;
+    }
+
+    const data = await this._hass.callApi(
+      "GET",
+      `frigate_timelapse/${this._entryId}/frames`
+    );
+    this._releaseImages();
+    this._session = data.session;
+    this._frames = data.frames;
+    this._layout = data.sprite;
+
+    const viewer = this.shadowRoot.getElementById("frame-viewer");
+    const slider = this.shadowRoot.getElementById("frame-slider");
+    const hasFrames = this._frames.length > 0;
+    viewer.hidden = !hasFrames;
+    slider.hidden = !hasFrames;
+    if (!hasFrames) {
+      this.shadowRoot.getElementById("frame-time").textContent =
+        "No hay fotogramas";
+      return;
+    }
+
+    const last = this._frames.length - 1;
+    slider.max = last;
+    slider.value = last;
+    this.shadowRoot.getElementById("frame-tile").style.aspectRatio =
+      `${this._layout.width} / ${this._layout.height}`;
+    this._showTile(last);
+  }
+
+  async _showTile(index) {
+    const layout = this._layout;
+    const sheet = Math.floor(index / layout.frames);
+    const position = index % layout.frames;
+    const sheetFrames = Math.min(
+      layout.frames,
+      this._frames.length - sheet * layout.frames
+    );
+    const rows = Math.ceil(sheetFrames / layout.columns);
+    const column = position % layout.columns;
+    const row = Math.floor(position / layout.columns);
+
+    this.shadowRoot.getElementById("frame-full").hidden = true;
+    this.shadowRoot.getElementById("frame-time").textContent = new Date(
+      this._frames[index].timestamp * 1000
+    ).toLocaleString();
+
+    const url = await this._fetchImage(
+      `sprites/${encodeURIComponent(this._session)}/${sheet}`
+    );
+    // The slider may have moved on while the sheet was loading
+    if (Number(this.shadowRoot.getElementById("frame-slider").value) !== index) {
+      return;
+    }
+    const tile = this.shadowRoot.getElementById("frame-tile");
+    tile.style.backgroundImage = `url(${url})`;
+    tile.style.backgroundSize = `${layout.columns * 100}% ${rows * 100}%`;
+    tile.style.backgroundPosition = `${
+      layout.columns > 1 ? (column / (layout.columns - 1)) * 100 : 0
+    }% ${rows > 1 ? (row / (rows - 1)) * 100 : 0}%`;
+  }
+
+  async _showThumbnail(index) {
+    const frame = this._frames[index];
+    const url = await this._fetchImage(`thumbnails/${frame.id}?width=640`);
+    if (Number(this.shadowRoot.getElementById("frame-slider").value) !== index) {
+      return;
+    }
+    const image = this.shadowRoot.getElementById("frame-full");
+    image.src = url;
+    image.hidden = false;
+  }
+
+  _fetchImage(path) {
+    // Images need the auth header, so they are fetched and shown as blobs
+    this._images = this._images || new Map();
+    if (!this._images.has(path)) {
+      const request = this._hass
+        .fetchWithAuth(`/api/frigate_timelapse/${this._entryId}/${path}`)
+        .then((response) => {
+          if (!response.ok) throw new Error(`HTTP ${response.status}`);
+          return response.blob();
+        })
+        .then((blob) => URL.createObjectURL(blob));
+      request.catch(() => this._images.delete(path));
+      this._images.set(path, request);
+    }
+    return this._images.get(path);
+  }
+
+  _releaseImages() {
+    if (!this._images) return;
+    for (const request of this._images.values()) {
+      request.then((url) => URL.revokeObjectURL(url)).catch(() => {});
+    }
+    this._images.clear();
   }
 
   _updateCard() {
@@ -274,7 +445,7 @@ class FrigateTimelapseCard extends HTMLElement {
   }
 
   getCardSize() {
-    return 6;
+    return 9;
   }
 }
 
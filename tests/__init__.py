@@ -0,0 +1 @@
+"""Tests for the Frigate Timelapse integration."""
@@ -0,0 +1,110 @@
+"""Tests for adaptive capture driven by detection activity."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.frigate_timelapse.activity import (
+    ActivityMonitor,
+    FakeEventSource,
+)
+from custom_components.frigate_timelapse.timelapse_manager import TimelapseManager
+
+
+async def _run_activity_cycle(config_dir: Path) -> list[float]:
+    """Start capturing, raise and clear activity, return the intervals seen."""
+    hass = HomeAssistant(str(config_dir))
+    source = FakeEventSource()
+    monitor = ActivityMonitor(hass, source)
+    capture_scheduler = MagicMock()
+    manager = TimelapseManager(
+        hass=hass,
+        frigate_api=MagicMock(),
+        scheduler=MagicMock(),
+        capture_scheduler=capture_scheduler,
+        frame_writer=MagicMock(),
+        retention=MagicMock(),
+        camera="front",
+        capture_interval=60,
+        output_path=str(config_dir / "timelapse"),
+        fps=30,
+        resolution="1920x1080",
+        activity=monitor,
+        active_interval=5,
+    )
+    manager.capture_single_image = AsyncMock()
+
+    await manager.start_capture()
+    intervals = [manager.capture_stats["capture_interval"]]
+
+    # Another camera's detections leave this one alone
+    source.active = {"back"}
+    await monitor._async_poll(datetime.now())
+    intervals.append(manager.capture_stats["capture_interval"])
+
+    source.active = {"front"}
+    await monitor._async_poll(datetime.now())
+    intervals.append(manager.capture_stats["capture_interval"])
+
+    # Ticks keep the fast interval while objects are tracked
+    deadline = datetime.now()
+    for _ in range(3):
+        deadline += timedelta(seconds=manager.capture_stats["capture_interval"])
+        await manager._periodic_capture(deadline)
+    intervals.append(manager.capture_stats["capture_interval"])
+
+    source.active = set()
+    await monitor._async_poll(datetime.now())
+    for _ in range(5):
+        deadline += timedelta(seconds=manager.capture_stats["capture_interval"])
+        await manager._periodic_capture(deadline)
+        intervals.append(manager.capture_stats["capture_interval"])
+
+    assert manager.capture_stats["missed_ticks"] == 0
+    capture_scheduler.set_interval.assert_called_with(manager._periodic_capture, 60)
+
+    await manager._async_stop_capture()
+    await hass.async_stop(force=True)
+    return intervals
+
+
+def test_interval_speeds_up_on_activity_and_decays(tmp_path: Path) -> None:
+    """Activity drops to the active interval, quiet ticks double it back."""
+    intervals = asyncio.run(_run_activity_cycle(tmp_path))
+
+    assert intervals == [60, 60, 5, 5, 10, 20, 40, 60, 60]
+
+
+async def _run_subscriptions(config_dir: Path) -> list[bool]:
+    """Subscribe while a camera is active, return the calls received."""
+    hass = HomeAssistant(str(config_dir))
+    source = FakeEventSource()
+    monitor = ActivityMonitor(hass, source)
+    calls: list[bool] = []
+
+    unsubscribe = monitor.subscribe("front", calls.append)
+    source.active = {"front"}
+    await monitor._async_poll(datetime.now())
+    await monitor._async_poll(datetime.now())
+
+    # A late subscriber learns about activity already in progress
+    late_calls: list[bool] = []
+    unsubscribe_late = monitor.subscribe("front", late_calls.append)
+
+    source.active = set()
+    await monitor._async_poll(datetime.now())
+    unsubscribe()
+    unsubscribe_late()
+
+    await hass.async_stop(force=True)
+    return calls + late_calls
+
+
+def test_monitor_reports_changes_only(tmp_path: Path) -> None:
+    """Subscribers hear when activity starts and ends, not every poll."""
+    assert asyncio.run(_run_subscriptions(tmp_path)) == [True, False, True, False]
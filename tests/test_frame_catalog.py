@@ -0,0 +1,48 @@
+"""Tests for the frame catalog queries."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from custom_components.frigate_timelapse.frame_catalog import Frame, FrameCatalog
+
+CAMERA = "front"
+SESSION = "20250101_000000"
+START = datetime(2025, 1, 1)
+
+
+@pytest.fixture
+def catalog(tmp_path: Path) -> Iterator[FrameCatalog]:
+    """Return an open catalog holding ten frames of two cameras."""
+    catalog = FrameCatalog(tmp_path / "frigate_timelapse.db")
+    catalog.open()
+    for index in range(10):
+        for camera in (CAMERA, "back"):
+            catalog.add_frame(
+                Frame(
+                    camera,
+                    SESSION,
+                    START + timedelta(minutes=index),
+                    tmp_path / camera / f"{index}.jpg",
+                    100,
+                )
+            )
+    yield catalog
+    catalog.close()
+
+
+def test_get_frame_index_pages(catalog: FrameCatalog) -> None:
+    """Offset and limit select a page of one camera's frames in order."""
+    timestamps = [row[1] for row in catalog.get_frame_index(CAMERA, SESSION)]
+    assert len(timestamps) == 10
+
+    page = catalog.get_frame_index(CAMERA, SESSION, offset=4, limit=3)
+    assert [row[1] for row in page] == timestamps[4:7]
+    assert catalog.get_frame_index(CAMERA, SESSION, offset=8, limit=3)[-1][1] == (
+        timestamps[-1]
+    )
+    assert catalog.get_frame_index(CAMERA, SESSION, offset=10, limit=3) == []
@@ -0,0 +1,260 @@
+"""Tests for frame thinning, quota trimming and pack compaction."""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from custom_components.frigate_timelapse.frame_catalog import (
+    FRAME_TIMESTAMP_FORMAT,
+    Frame,
+    FrameCatalog,
+    session_dir,
+)
+from custom_components.frigate_timelapse.frame_store import (
+    RECORD_HEADER,
+    PackedFrameStore,
+    compact_pack,
+    iter_pack_records,
+    read_frame,
+)
+from custom_components.frigate_timelapse.retention import (
+    discard_frames,
+    prune_thumbnails,
+    thin_batch,
+    trim_batch,
+)
+
+CAMERA = "front"
+SESSION = "20250101_000000"
+NOW = datetime(2025, 3, 1, 12, 0)
+
+
+@pytest.fixture
+def catalog(tmp_path: Path) -> Iterator[FrameCatalog]:
+    """Return an open catalog in a temporary directory."""
+    catalog = FrameCatalog(tmp_path / "frigate_timelapse.db")
+    catalog.open()
+    yield catalog
+    catalog.close()
+
+
+@pytest.fixture
+def output_path(tmp_path: Path) -> Path:
+    """Return the output directory of the camera."""
+    return tmp_path / "timelapse"
+
+
+def add_loose(
+    catalog: FrameCatalog,
+    output_path: Path,
+    timestamp: datetime,
+    session: str = SESSION,
+) -> Frame:
+    """Write and record a loose frame."""
+    path = session_dir(output_path, CAMERA, session)
+    path.mkdir(parents=True, exist_ok=True)
+    path /= f"frame_{timestamp.strftime(FRAME_TIMESTAMP_FORMAT)}.jpg"
+    path.write_bytes(b"jpeg")
+    frame = Frame(CAMERA, session, timestamp, path, 4)
+    catalog.add_frame(frame)
+    return frame
+
+
+def add_packed(
+    catalog: FrameCatalog,
+    store: PackedFrameStore,
+    output_path: Path,
+    timestamp: datetime,
+    data: bytes,
+    session: str = SESSION,
+) -> None:
+    """Append and record a packed frame."""
+    path = session_dir(output_path, CAMERA, session)
+    path.mkdir(parents=True, exist_ok=True)
+    pack_path, offset = store.append(path, timestamp, data)
+    catalog.add_frame(
+        Frame(CAMERA, session, timestamp, pack_path, len(data), offset=offset)
+    )
+
+
+def test_thin_batch_applies_tier_spacing(
+    catalog: FrameCatalog, output_path: Path
+) -> None:
+    """Frames a day old keep one in ten, frames a week old one per hour."""
+    start = NOW - timedelta(days=8)
+    for minute in range(180):
+        add_loose(catalog, output_path, start + timedelta(minutes=minute))
+
+    while thin_batch(catalog, CAMERA, 60, output_path, None, NOW):
+        pass
+
+    frames = catalog.get_frames(CAMERA)
+    assert [frame.timestamp for frame in frames] == [
+        start,
+        start + timedelta(hours=1),
+        start + timedelta(hours=2),
+    ]
+    # Only the kept frames are left on disk
+    assert sorted(session_dir(output_path, CAMERA, SESSION).iterdir()) == [
+        frame.path for frame in frames
+    ]
+
+
+def test_thin_batch_tolerates_jitter(catalog: FrameCatalog, output_path: Path) -> None:
+    """Frames captured a little early still keep the one in ten pattern."""
+    start = NOW - timedelta(days=2)
+    for index in range(30):
+        jitter = timedelta(seconds=-5 if index % 2 else 5)
+        add_loose(catalog, output_path, start + timedelta(minutes=index) + jitter)
+
+    thin_batch(catalog, CAMERA, 60, output_path, None, NOW)
+
+    assert len(catalog.get_frames(CAMERA)) == 3
+    # Recent frames are not touched
+    assert thin_batch(catalog, CAMERA, 60, output_path, None, NOW) == 0
+
+
+def test_delete_frames_promotes_duplicate(
+    catalog: FrameCatalog, output_path: Path
+) -> None:
+    """Deleting a kept frame hands its data over to its first duplicate."""
+    kept = add_loose(catalog, output_path, NOW)
+    for seconds in (60, 120):
+        catalog.add_frame(
+            Frame(
+                CAMERA,
+                SESSION,
+                NOW + timedelta(seconds=seconds),
+                kept.path,
+                kept.size,
+                duplicate=True,
+            )
+        )
+    first = catalog.get_frames(CAMERA)[0]
+
+    assert discard_frames(catalog, [first], None) == 0
+    assert kept.path.exists()
+    assert [frame.duplicate for frame in catalog.get_frames(CAMERA)] == [False, True]
+    assert catalog.get_loose_size(CAMERA) == kept.size
+
+    assert discard_frames(catalog, catalog.get_frames(CAMERA), None) == kept.size
+    assert not kept.path.exists()
+
+
+def test_trim_batch_skips_active_pack(catalog: FrameCatalog, output_path: Path) -> None:
+    """The pack being appended to survives trimming, older ones do not."""
+    store = PackedFrameStore(max_bytes=3 * (RECORD_HEADER.size + 100))
+    for index in range(6):
+        add_packed(
+            catalog,
+            store,
+            output_path,
+            NOW + timedelta(minutes=index),
+            bytes([index]) * 100,
+        )
+    packs = sorted(session_dir(output_path, CAMERA, SESSION).glob("pack_*.bin"))
+    assert len(packs) == 2
+    size = packs[0].stat().st_size
+
+    assert trim_batch(catalog, CAMERA, output_path, SESSION) == size
+    assert not packs[0].exists()
+    assert [frame.path for frame in catalog.get_frames(CAMERA)] == [packs[1]] * 3
+    assert trim_batch(catalog, CAMERA, output_path, SESSION) is None
+
+
+def test_trim_batch_removes_emptied_session(
+    catalog: FrameCatalog, output_path: Path
+) -> None:
+    """A finished session whose frames are all trimmed is deleted."""
+    old = add_loose(catalog, output_path, NOW - timedelta(days=1), "20250101_000000")
+    current = add_loose(catalog, output_path, NOW, "20250102_000000")
+
+    assert trim_batch(catalog, CAMERA, output_path, "20250102_000000") == 8
+
+    # The current session keeps its directory for the next captures
+    assert not old.path.parent.exists()
+    assert current.path.parent.exists()
+    assert catalog.get_sessions(CAMERA) == []
+
+
+def test_discard_frames_compacts_pack(catalog: FrameCatalog, output_path: Path) -> None:
+    """A pack mostly holding deleted records is rewritten with new offsets."""
+    store = PackedFrameStore()
+    payloads = [b"a" * 1000, b"b" * 10, b"c" * 1000, b"d" * 10]
+    for index, data in enumerate(payloads):
+        add_packed(catalog, store, output_path, NOW + timedelta(minutes=index), data)
+    frames = catalog.get_frames(CAMERA)
+    pack_path = frames[0].path
+    size = pack_path.stat().st_size
+
+    freed = discard_frames(catalog, [frames[0], frames[2]], None)
+
+    remaining = catalog.get_frames(CAMERA)
+    assert [read_frame(frame) for frame in remaining] == [b"b" * 10, b"d" * 10]
+    assert pack_path.stat().st_size == 2 * (RECORD_HEADER.size + 10)
+    assert freed == size - pack_path.stat().st_size
+    assert [record[1:] for record in iter_pack_records(pack_path)] == [
+        (frame.offset, frame.size) for frame in remaining
+    ]
+
+
+def test_discard_frames_leaves_active_pack(
+    catalog: FrameCatalog, output_path: Path
+) -> None:
+    """The pack being appended to is never rewritten under the writer."""
+    store = PackedFrameStore()
+    for index, data in enumerate([b"a" * 1000, b"b" * 10]):
+        add_packed(catalog, store, output_path, NOW + timedelta(minutes=index), data)
+    frames = catalog.get_frames(CAMERA)
+    size = frames[0].path.stat().st_size
+
+    assert discard_frames(catalog, [frames[0]], frames[0].path) == 0
+    assert frames[0].path.stat().st_size == size
+    assert read_frame(catalog.get_frames(CAMERA)[0]) == b"b" * 10
+
+
+def test_compact_pack_remaps_offsets(tmp_path: Path) -> None:
+    """Kept records move to the front and their old offsets map to new ones."""
+    store = PackedFrameStore()
+    records = []
+    for index, data in enumerate([b"x" * 50, b"y" * 20, b"z" * 30]):
+        timestamp = NOW + timedelta(minutes=index)
+        pack_path, offset = store.append(tmp_path, timestamp, data)
+        records.append((timestamp, offset, len(data)))
+
+    moves = compact_pack(pack_path, [records[1], records[2]])
+
+    header = RECORD_HEADER.size
+    assert moves == [
+        (records[1][1], header),
+        (records[2][1], 2 * header + 20),
+    ]
+    assert list(iter_pack_records(pack_path)) == [
+        (records[1][0], header, 20),
+        (records[2][0], 2 * header + 20, 30),
+    ]
+
+
+def test_prune_thumbnails_keeps_recently_used(output_path: Path) -> None:
+    """Rendered images over the budget go least recently used first."""
+    cache_dir = output_path / "thumbnails" / CAMERA / SESSION
+    cache_dir.mkdir(parents=True)
+    for index in range(4):
+        path = cache_dir / f"{index}.jpg"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (index, index))
+    # An image being written is not pruned
+    (cache_dir / ".4.jpg.part").write_bytes(b"x" * 100)
+
+    assert prune_thumbnails(output_path, CAMERA, max_bytes=250) == 200
+    assert sorted(path.name for path in cache_dir.iterdir()) == [
+        ".4.jpg.part",
+        "2.jpg",
+        "3.jpg",
+    ]
+    assert prune_thumbnails(output_path, CAMERA, max_bytes=250) == 0